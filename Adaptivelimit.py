@@ -0,0 +1,317 @@
+""" ADAPTIVE CONCURRENCY LIMITS IN PYTHON """
+
+""" Definition
+threading_1.limited_access uses Semaphore(2): at most two threads use the resource at once. The right number is
+rarely known in advance and changes with load. Too low starves the backend; too high overloads it, and its
+latency grows until requests time out.
+
+AdaptiveLimiter is Ratelimiting.MaxInFlight with a limit that moves. Every finished call reports its latency and
+whether it failed, and an algorithm picks the next limit:
+
+.AIMD (additive increase, multiplicative decrease): +1 per round of `limit` good calls while the limit is in
+ use; times `backoff` after an error or a call slower than `latency_threshold`, at most once per round.
+ Simple, but needs a threshold.
+.Vegas (gradient): Keeps the lowest latency seen recently as the no-load latency, and estimates how many calls
+ are queued inside the backend as limit * (1 - no_load / latency). Fewer than alpha queued: grow; more than
+ beta: shrink (both by about log10(limit) per round of `limit` calls); errors: shrink at once. No threshold
+ needed: it settles just past the knee where latency starts to climb.
+
+Waiting callers queue in FIFO order, in threads (acquire) or in asyncio (acquire_async), exactly as in
+MaxInFlight. `limit` and `queueing_delay` (a moving average of how long callers waited for a permit) are
+exposed for monitoring, and stats() adds them to MaxInFlight's counters. """
+
+import asyncio
+import collections
+import contextlib
+import functools
+import math
+import random
+import threading
+import time
+
+from Ratelimiting import MaxInFlight
+
+
+""" 1-Algorithms
+update(limit, latency, in_flight, error) returns the new limit as a float; the limiter rounds and clamps it. """
+
+
+class AIMD:
+    def __init__(self, latency_threshold, backoff=0.9):
+        self.latency_threshold = latency_threshold
+        self.backoff = backoff
+        self._cooldown = 0
+
+    def update(self, limit, latency, in_flight, error):
+        if error or latency > self.latency_threshold:
+            if self._cooldown > 0:  # Calls started before the last decrease report the same overload
+                self._cooldown -= 1
+                return limit
+            self._cooldown = int(limit)
+            return limit * self.backoff
+        self._cooldown = max(0, self._cooldown - 1)
+        if in_flight * 2 >= limit:  # Only grow a limit that is actually being used
+            return limit + 1 / limit  # About +1 per round of `limit` calls
+        return limit
+
+
+class Vegas:
+    def __init__(self, alpha=3, beta=6, window=500):
+        self.alpha = alpha
+        self.beta = beta
+        self.window = window
+        self.no_load = None
+        self._window_min = None
+        self._samples = 0
+
+    def _observe(self, latency):
+        """no_load is the lowest latency of the previous window (or lower), so it can follow a backend that
+        got slower for good without jumping to a single high sample."""
+        self._samples += 1
+        if self._window_min is None or latency < self._window_min:
+            self._window_min = latency
+        if self.no_load is None or latency < self.no_load:
+            self.no_load = latency
+        if self._samples % self.window == 0:
+            self.no_load, self._window_min = self._window_min, None
+
+    def update(self, limit, latency, in_flight, error):
+        self._observe(latency)
+        step = max(1.0, math.log10(limit))
+        if error:
+            return limit - step
+        queued = limit * (1 - self.no_load / latency) if latency > 0 else 0.0
+        if queued < self.alpha * step and in_flight * 2 >= limit:  # Only grow a limit that is in use
+            return limit + step / limit  # About +step per round of `limit` calls
+        if queued > self.beta * step:
+            return limit - step / limit
+        return limit
+
+
+""" 2-The Limiter """
+
+
+class AdaptiveLimiter(MaxInFlight):
+    def __init__(self, algorithm=None, initial=4, min_limit=1, max_limit=1000, smoothing=0.05, history=256):
+        super().__init__(initial)
+        self.algorithm = algorithm or Vegas()
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self._estimate = float(initial)
+        self._smoothing = smoothing
+        self.queueing_delay = 0.0
+        self.errors = 0
+        self.history = collections.deque(maxlen=history)  # The latest (time, limit) changes
+
+    @property
+    def limit(self):
+        return self.n
+
+    def _waited(self, seconds):
+        with self._lock:
+            self.queueing_delay += self._smoothing * (seconds - self.queueing_delay)
+
+    def acquire(self, block=True, timeout=None):
+        start = time.monotonic()
+        super().acquire(block, timeout)
+        self._waited(time.monotonic() - start)
+
+    async def acquire_async(self, block=True, timeout=None):
+        start = time.monotonic()
+        await super().acquire_async(block, timeout)
+        self._waited(time.monotonic() - start)
+
+    def release(self, latency=None, error=False):
+        """Give the permit back; with a latency (seconds) the call also feeds the algorithm."""
+        with self._lock:
+            if latency is not None:
+                self._update_locked(latency, error)
+            if self._active > self.n:  # The limit shrank below what is running: retire this permit
+                self._active -= 1
+                return
+            if self._waiters:
+                self._waiters.popleft().grant()
+                self.allowed += 1
+            else:
+                self._active -= 1
+
+    def _update_locked(self, latency, error):
+        if error:
+            self.errors += 1
+        estimate = self.algorithm.update(self._estimate, latency, self._active, error)
+        self._estimate = min(self.max_limit, max(self.min_limit, estimate))
+        new = int(self._estimate)
+        if new == self.n:
+            return
+        self.n = new
+        self.history.append((time.monotonic(), new))
+        while self._waiters and self._active < new:  # Hand out the new headroom
+            self._waiters.popleft().grant()
+            self._active += 1
+            self.allowed += 1
+            self.peak = max(self.peak, self._active)
+
+    @contextlib.contextmanager
+    def permit(self, block=True, timeout=None):
+        """with limiter.permit(): call() -- times the call and counts an exception as an error."""
+        self.acquire(block, timeout)
+        start = time.monotonic()
+        error = True
+        try:
+            yield
+            error = False
+        finally:
+            self.release(time.monotonic() - start, error)
+
+    @contextlib.asynccontextmanager
+    async def permit_async(self, block=True, timeout=None):
+        await self.acquire_async(block, timeout)
+        start = time.monotonic()
+        error = True
+        try:
+            yield
+            error = False
+        finally:
+            self.release(time.monotonic() - start, error)
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats.update(limit=self.n, queueing_delay_s=self.queueing_delay, errors=self.errors)
+        return stats
+
+
+def adaptive(limiter=None, block=True, timeout=None):
+    """Decorator: run a function or coroutine function under an AdaptiveLimiter."""
+    limiter = limiter or AdaptiveLimiter()
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                async with limiter.permit_async(block, timeout):
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with limiter.permit(block, timeout):
+                    return func(*args, **kwargs)
+        wrapper.limiter = limiter
+        return wrapper
+    return decorator
+
+
+""" 3-Simulated Backend
+Up to `capacity` concurrent calls take base_latency. Past that knee calls queue inside the backend, so latency
+grows with the overload, and past `overload` x capacity some calls fail. """
+
+
+class BackendError(RuntimeError):
+    pass
+
+
+class SimulatedBackend:
+    def __init__(self, capacity=8, base_latency=0.01, overload=3.0):
+        self.capacity = capacity
+        self.base_latency = base_latency
+        self.overload = overload
+        self._active = 0
+        self._lock = threading.Lock()
+        self.completed = 0
+
+    def _enter(self):
+        with self._lock:
+            self._active += 1
+            active = self._active
+        latency = self.base_latency * max(1.0, active / self.capacity) ** 2
+        failed = active > self.overload * self.capacity and random.random() < 0.5
+        return latency, failed
+
+    def _leave(self, failed):
+        with self._lock:
+            self._active -= 1
+            if not failed:
+                self.completed += 1
+        if failed:
+            raise BackendError("backend overloaded")
+
+    def call(self):
+        latency, failed = self._enter()
+        time.sleep(latency)
+        self._leave(failed)
+
+    async def call_async(self):
+        latency, failed = self._enter()
+        await asyncio.sleep(latency)
+        self._leave(failed)
+
+
+def _drive_threads(backend, run, threads, duration):
+    stop = time.monotonic() + duration
+    latencies = []
+    failures = [0]
+
+    def client():
+        while time.monotonic() < stop:
+            start = time.monotonic()
+            try:
+                run()
+            except BackendError:
+                failures[0] += 1
+            latencies.append(time.monotonic() - start)
+
+    workers = [threading.Thread(target=client) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    latencies.sort()
+    return backend.completed / duration, latencies[int(len(latencies) * 0.99)], failures[0]
+
+
+def compare(threads=48, duration=3.0, capacity=8):
+    """Fixed semaphores of several sizes vs the adaptive limiters, many threads calling as fast as they can."""
+    print(f"backend knee at {capacity} concurrent calls, {threads} client threads, {duration:.0f}s each")
+    print(f"{'limiter':<22}{'ok calls/s':>11}{'p99 ms':>9}{'errors':>8}{'final limit':>13}{'queue ms':>10}")
+    setups = [(f"Semaphore({n})", lambda n=n: threading.Semaphore(n)) for n in (2, capacity, threads)]
+    setups += [("AIMD", lambda: AdaptiveLimiter(AIMD(latency_threshold=0.02))),
+               ("Vegas", lambda: AdaptiveLimiter(Vegas()))]
+    for label, factory in setups:
+        backend = SimulatedBackend(capacity)
+        limiter = factory()
+        if isinstance(limiter, AdaptiveLimiter):
+            def run():
+                with limiter.permit():
+                    backend.call()
+        else:
+            def run():
+                with limiter:
+                    backend.call()
+        rate, p99, errors = _drive_threads(backend, run, threads, duration)
+        extra = (f"{limiter.limit:>13}{limiter.queueing_delay * 1e3:>10.1f}"
+                 if isinstance(limiter, AdaptiveLimiter) else f"{'':>13}{'':>10}")
+        print(f"{label:<22}{rate:>11.0f}{p99 * 1e3:>9.1f}{errors:>8}{extra}")
+
+
+async def _asyncio_demo(tasks=200, duration=2.0, capacity=8):
+    backend = SimulatedBackend(capacity)
+    limiter = AdaptiveLimiter(Vegas())
+    stop = time.monotonic() + duration
+
+    @adaptive(limiter)
+    async def fetch():
+        await backend.call_async()
+
+    async def client():
+        while time.monotonic() < stop:
+            with contextlib.suppress(BackendError):
+                await fetch()
+
+    await asyncio.gather(*(client() for _ in range(tasks)))
+    print(f"asyncio, {tasks} tasks: {backend.completed / duration:.0f} ok calls/s, limit {limiter.limit}, "
+          f"queueing delay {limiter.queueing_delay * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    compare()
+    asyncio.run(_asyncio_demo())
@@ -0,0 +1,286 @@
+""" ASYNCHRONOUS LOGGING IN PYTHON """
+
+""" Definition
+Decorators.log_decorator and Paradigms.debug build f-strings and call print() inside the wrapped call, so the
+cost of formatting and of the write itself is paid by every call of the decorated function.
+
+This module moves that work off the hot path:
+
+.Ring buffer: The decorated call only appends a small record to a bounded, preallocated ring buffer.
+.Writer thread: A background thread drains the buffer and writes records in batches, either when batch_size
+ records are waiting or when flush_interval seconds have passed, with a single write() per batch.
+.Full buffer policy: "drop" discards the new record and counts it, "block" makes the caller wait for space.
+.Write errors: If the stream's write() fails (disk full, closed pipe) the batch is lost and counted in stats()
+ as write_errors/failed; the writer keeps running, so blocked callers are still released.
+.Lazy formatting: Arguments and results are stored as objects and only turned into text by the writer thread,
+ so dropped records are never formatted at all.
+
+Because formatting happens later, a mutable argument that is changed after the call is logged in its new state. """
+
+import atexit
+import functools
+import sys
+import threading
+import time
+
+DROP = "drop"
+BLOCK = "block"
+
+
+""" 1-Records
+A record keeps references to the call data; format() is only called by the writer. """
+
+
+class CallRecord:
+    __slots__ = ("created", "name", "args", "kwargs", "result", "error")
+
+    def __init__(self, created, name, args, kwargs, result, error):
+        self.created = created
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.result = result
+        self.error = error
+
+    def format(self):
+        stamp = time.strftime("%H:%M:%S", time.localtime(self.created))
+        outcome = f"raised {self.error!r}" if self.error is not None else f"returned {self.result!r}"
+        return f"{stamp} Calling {self.name} with {self.args} and {self.kwargs}: {outcome}\n"
+
+
+class MessageRecord:
+    __slots__ = ("created", "template", "values")
+
+    def __init__(self, created, template, values):
+        self.created = created
+        self.template = template
+        self.values = values
+
+    def format(self):
+        stamp = time.strftime("%H:%M:%S", time.localtime(self.created))
+        return f"{stamp} {self.template.format(*self.values)}\n"
+
+
+""" 2-The Sink
+A preallocated list used as a ring buffer (head index + count) guarded by one Condition. """
+
+
+class AsyncLogSink:
+    def __init__(self, stream=None, capacity=8192, batch_size=256, flush_interval=0.1, policy=DROP):
+        if capacity < 1 or batch_size < 1:
+            raise ValueError("capacity and batch_size must be >= 1")
+        if policy not in (DROP, BLOCK):
+            raise ValueError(f"policy must be {DROP!r} or {BLOCK!r}")
+        self.stream = stream if stream is not None else sys.stdout
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self._buffer = [None] * capacity
+        self._head = 0
+        self._count = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._closed = False
+        self._flush_waiters = 0
+        self.emitted = self.dropped = self.written = self.batches = 0
+        self.failed = self.write_errors = 0
+        self.last_error = None
+        self._writer = threading.Thread(target=self._run, name="AsyncLogSink-writer", daemon=True)
+        self._writer.start()
+
+    def emit(self, record):
+        """Queue a record; returns False if it was dropped."""
+        with self._cond:
+            while self._count == self.capacity and not self._closed:
+                if self.policy == DROP:
+                    self.dropped += 1
+                    return False
+                self._cond.wait()
+            if self._closed:
+                self.dropped += 1
+                return False
+            self._buffer[(self._head + self._count) % self.capacity] = record
+            self._count += 1
+            self.emitted += 1
+            if self._count >= self.batch_size:
+                self._cond.notify_all()
+            return True
+
+    def log(self, template, *values):
+        """Queue a str.format template; formatting happens on the writer thread."""
+        return self.emit(MessageRecord(time.time(), template, values))
+
+    def _take_batch(self):
+        n = min(self._count, self.batch_size)
+        batch = []
+        for _ in range(n):
+            batch.append(self._buffer[self._head])
+            self._buffer[self._head] = None
+            self._head = (self._head + 1) % self.capacity
+        self._count -= n
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while (self._count < self.batch_size and not self._closed
+                       and not (self._flush_waiters and self._count)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take_batch()
+                if self.policy == BLOCK and batch:
+                    self._cond.notify_all()
+                done = self._closed and not self._count
+            if batch:
+                self._write(batch)
+            with self._cond:
+                if not self._count:
+                    self._cond.notify_all()  # Wake flush() callers
+            if done:
+                return
+
+    def _write(self, batch):
+        lines = []
+        for record in batch:
+            try:
+                lines.append(record.format())
+            except Exception as exc:  # A bad __repr__ must not kill the writer
+                lines.append(f"<unformattable record {type(record).__name__}: {exc!r}>\n")
+        try:
+            self.stream.write("".join(lines))
+            self.stream.flush()
+        except Exception as exc:  # A failing stream must not kill the writer either
+            with self._cond:
+                self.failed += len(batch)
+                self.write_errors += 1
+                self.last_error = exc
+            return
+        with self._cond:
+            self.written += len(batch)
+            self.batches += 1
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written (or failed to write)."""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                while self.written + self.failed < self.emitted and self._writer.is_alive():
+                    remaining = None if end is None else end - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                return True
+            finally:
+                self._flush_waiters -= 1
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+
+    def stats(self):
+        with self._cond:
+            return {"emitted": self.emitted, "dropped": self.dropped, "written": self.written,
+                    "batches": self.batches, "queued": self._count, "failed": self.failed,
+                    "write_errors": self.write_errors}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_default_sink = None
+_default_lock = threading.Lock()
+
+
+def default_sink():
+    global _default_sink
+    with _default_lock:
+        if _default_sink is None:
+            _default_sink = AsyncLogSink()
+            atexit.register(_default_sink.close)
+        return _default_sink
+
+
+""" 3-The Decorator
+Same output as log_decorator, but the wrapper only records the call and hands it to the sink. """
+
+
+def log_calls(func=None, sink=None):
+    if func is None:
+        return lambda f: log_calls(f, sink=sink)
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        target = sink or _default_sink or default_sink()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as exc:
+            target.emit(CallRecord(time.time(), name, args, kwargs, None, exc))
+            raise
+        target.emit(CallRecord(time.time(), name, args, kwargs, result, None))
+        return result
+    return wrapper
+
+
+""" 4-Comparison
+Time spent on the caller's thread with print-per-call vs the async sink, both writing to a real file.
+The print version flushes every line, as stdout does when attached to a terminal. """
+
+
+def benchmark(calls=50_000):
+    import os
+    import tempfile
+
+    def log_decorator(func):
+        def wrapper(*args, **kwargs):
+            print(f"Calling {func.__name__} with {args} and {kwargs}", file=out, flush=True)
+            result = func(*args, **kwargs)
+            print(f"{func.__name__} returned {result}", file=out, flush=True)
+            return result
+        return wrapper
+
+    fd, path = tempfile.mkstemp(suffix=".log")
+    os.close(fd)
+    try:
+        with open(path, "w") as out:
+            sync_add = log_decorator(lambda a, b: a + b)
+            start = time.perf_counter()
+            for i in range(calls):
+                sync_add(i, i)
+            sync_time = time.perf_counter() - start
+
+        with open(path, "w") as out, AsyncLogSink(out, capacity=calls, batch_size=1024, policy=BLOCK) as sink:
+            async_add = log_calls(lambda a, b: a + b, sink=sink)
+            start = time.perf_counter()
+            for i in range(calls):
+                async_add(i, i)
+            async_time = time.perf_counter() - start
+            sink.flush()
+            stats = sink.stats()
+    finally:
+        os.remove(path)
+    print(f"print per call: {sync_time / calls * 1e6:.2f} us/call")
+    print(f"async sink:     {async_time / calls * 1e6:.2f} us/call on the caller thread  {stats}")
+
+
+if __name__ == "__main__":
+    @log_calls
+    def add(a, b):
+        return a + b
+
+    add(3, 5)
+    default_sink().log("{} + {} = {}", 1, 2, 3)
+    default_sink().flush()
+    benchmark()
@@ -0,0 +1,270 @@
+""" AN ASYNCIO TASK RUNNER IN PYTHON """
+
+""" Definition
+Paradigms.py runs a single coroutine with asyncio.run(greet()). Real programs run thousands of coroutines and
+need to bound how many run at once, hand work from producers to consumers, give up on slow work, and call
+blocking libraries without freezing the event loop.
+
+.bounded_gather(aws, limit) and bounded_map(func, iterable, limit): Like asyncio.gather, but at most `limit`
+ awaitables run at once. `limit` worker tasks pull from the input, so 100k inputs cost `limit` tasks, not 100k.
+ Results come back in input order.
+.Timeouts: item_timeout bounds every single call (it fails with TimeoutError); timeout bounds the whole call.
+.Cancellation: If a call fails (and return_exceptions is False), or the overall timeout expires, or the caller
+ is cancelled, the calls still running are cancelled and the ones not yet started are never started.
+ With return_exceptions=True the exceptions (TimeoutError included) take the place of the results.
+.AsyncBatchQueue(maxsize, batch_size, max_wait): An asyncio producer/consumer queue. get_batch() returns up to
+ batch_size items; once one item is there it waits at most max_wait for more, so consumers can amortize a
+ per-call cost (a database round trip) without delaying a lone item for long. close() lets consumers drain
+ what is left, then get_batch() raises Workqueue.QueueClosed.
+.BlockingBridge(max_workers): Runs blocking functions on its own ThreadPoolExecutor, so at most max_workers of
+ them run at once and they cannot starve other users of the loop's default executor. Cancelling the awaiting
+ task drops a call that has not started; a call already running on a thread cannot be interrupted and runs to
+ completion. """
+
+import asyncio
+import collections
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Workqueue import QueueClosed
+
+
+""" 1-Bounded Gather and Map """
+
+
+async def _call(func, item, item_timeout):
+    if item_timeout is None:
+        return await func(item)
+    return await asyncio.wait_for(func(item), item_timeout)
+
+
+async def _bounded(func, iterable, limit, item_timeout, return_exceptions):
+    items = enumerate(iterable)
+    results = {}
+
+    async def worker():
+        for index, item in items:  # Shared iterator: each worker takes the next unclaimed item
+            try:
+                results[index] = await _call(func, item, item_timeout)
+            except Exception as exc:
+                if not return_exceptions:
+                    raise
+                results[index] = exc
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, limit))]
+    try:
+        done, _ = await asyncio.wait(workers, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for _, item in items:  # Awaitables that were never started must still be closed
+            if asyncio.iscoroutine(item):
+                item.close()
+    return [results[index] for index in range(len(results))]
+
+
+async def bounded_map(func, iterable, limit=100, timeout=None, item_timeout=None, return_exceptions=False):
+    """[await func(item) for item in iterable], with at most `limit` calls in flight."""
+    if timeout is None:
+        return await _bounded(func, iterable, limit, item_timeout, return_exceptions)
+    return await asyncio.wait_for(_bounded(func, iterable, limit, item_timeout, return_exceptions), timeout)
+
+
+async def _identity(awaitable):
+    return await awaitable
+
+
+async def bounded_gather(aws, limit=100, timeout=None, item_timeout=None, return_exceptions=False):
+    """asyncio.gather(*aws) with at most `limit` of them running at once. aws may be a lazy iterable."""
+    return await bounded_map(_identity, aws, limit, timeout, item_timeout, return_exceptions)
+
+
+""" 2-Batching Queue """
+
+
+class AsyncBatchQueue:
+    def __init__(self, maxsize=0, batch_size=64, max_wait=0.01):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._items = collections.deque()
+        self._lock = asyncio.Lock()
+        self._not_empty = asyncio.Condition(self._lock)
+        self._not_full = asyncio.Condition(self._lock)
+        self._closed = False
+        self.batches = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    async def put(self, item):
+        async with self._lock:
+            while self.maxsize and len(self._items) >= self.maxsize and not self._closed:
+                await self._not_full.wait()
+            if self._closed:
+                raise QueueClosed("put() on a closed queue")
+            self._items.append(item)
+            self._not_empty.notify()
+
+    async def close(self):
+        """No more puts; consumers get what is left, then QueueClosed."""
+        async with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    async def get_batch(self, batch_size=None, max_wait=None):
+        batch_size = batch_size or self.batch_size
+        max_wait = self.max_wait if max_wait is None else max_wait
+        async with self._lock:
+            while not self._items and not self._closed:
+                await self._not_empty.wait()
+            if not self._items:
+                raise QueueClosed("queue closed and drained")
+            deadline = time.monotonic() + max_wait
+            while len(self._items) < batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._not_empty.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            items = self._items
+            batch = [items.popleft() for _ in range(min(batch_size, len(items)))]
+            self._not_full.notify(len(batch))
+            if items:  # Leave the rest for another consumer
+                self._not_empty.notify()
+            self.batches += 1
+            return batch
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.get_batch()
+        except QueueClosed:
+            raise StopAsyncIteration from None
+
+
+""" 3-Blocking Bridge """
+
+
+class BlockingBridge:
+    def __init__(self, max_workers=32, thread_name_prefix="bridge"):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix=thread_name_prefix)
+
+    async def run(self, func, /, *args, **kwargs):
+        """await bridge.run(blocking_func, ...) -- like asyncio.to_thread, on this bridge's threads."""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        return await loop.run_in_executor(self._executor, call)
+
+    def wrap(self, func):
+        """Decorator: turn a blocking function into a coroutine function that runs on the bridge."""
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await self.run(func, *args, **kwargs)
+        return wrapper
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self._executor.shutdown(wait, cancel_futures=cancel_futures)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+
+""" 4-Benchmark
+10k simulated I/O calls of 20-80 ms each: coroutines with asyncio.sleep under bounded_map, against time.sleep
+calls on a ThreadPoolExecutor as in threading_1.py, and against the same blocking calls through the bridge.
+Threads are bounded by max_workers (each costs a stack and a context switch per wakeup); coroutines are only
+bounded by `limit`, and a thousand sleeping coroutines cost little more than one. """
+
+
+def _delay(i):
+    return 0.02 + (i * 7919 % 61) / 1000
+
+
+async def simulated_io(i):
+    await asyncio.sleep(_delay(i))
+    return i
+
+
+def blocking_io(i):
+    time.sleep(_delay(i))
+    return i
+
+
+def _report(label, tasks, wall, cpu):
+    print(f"{label:<36}{wall:>8.2f}s{tasks / wall:>10,.0f} tasks/s{cpu:>8.2f}s CPU")
+
+
+def benchmark(tasks=10_000):
+    expected = list(range(tasks))
+    print(f"{tasks} simulated I/O calls, 20-80 ms each")
+    for limit in (100, 1000, tasks):
+        wall, cpu = time.perf_counter(), time.process_time()
+        assert asyncio.run(bounded_map(simulated_io, range(tasks), limit)) == expected
+        _report(f"asyncio bounded_map, limit {limit}", tasks, time.perf_counter() - wall, time.process_time() - cpu)
+    for workers in (100, 1000):
+        wall, cpu = time.perf_counter(), time.process_time()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            assert list(executor.map(blocking_io, range(tasks))) == expected
+        _report(f"ThreadPoolExecutor, {workers} threads", tasks, time.perf_counter() - wall,
+                time.process_time() - cpu)
+    wall, cpu = time.perf_counter(), time.process_time()
+    with BlockingBridge(max_workers=100) as bridge:
+        result = asyncio.run(bounded_map(bridge.wrap(blocking_io), range(tasks), limit=100))
+    assert result == expected
+    _report("BlockingBridge, 100 threads", tasks, time.perf_counter() - wall, time.process_time() - cpu)
+
+
+async def _example():
+    async def flaky(i):
+        if i == 3:
+            raise ValueError(f"item {i} failed")
+        await asyncio.sleep(0.01 * (i % 4))
+        return i * i
+
+    print(await bounded_map(flaky, range(8), limit=3, return_exceptions=True))
+    print(await bounded_gather((asyncio.sleep(0.5 if i == 2 else 0, i) for i in range(5)), limit=2,
+                               item_timeout=0.1, return_exceptions=True))
+    try:
+        await bounded_map(flaky, range(100), limit=4)
+    except ValueError as exc:
+        print(f"first failure cancelled the rest: {exc}")
+
+    queue = AsyncBatchQueue(maxsize=100, batch_size=32, max_wait=0.005)
+
+    async def producer():
+        for i in range(1000):
+            await queue.put(i)
+        await queue.close()
+
+    async def consumer():
+        total = 0
+        async for batch in queue:
+            total += sum(batch)
+        return total
+
+    totals = await asyncio.gather(producer(), consumer(), consumer())
+    print(f"batched queue: sum {sum(totals[1:])} in {queue.batches} batches")
+
+    with BlockingBridge(max_workers=4) as bridge:
+        print(await bridge.run(sum, range(10)), await bridge.wrap(blocking_io)(5))
+
+
+if __name__ == "__main__":
+    asyncio.run(_example())
+    benchmark()
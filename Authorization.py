@@ -0,0 +1,194 @@
+""" CACHED AUTHORIZATION IN PYTHON """
+
+""" Definition
+Decorators.require_login reads "logged_in" from a dict on every call and knows about one user at a time.
+Real checks ask a session store, which is slow, so this module puts three things in front of it:
+
+.Decision cache: Allowed and denied answers are cached with their own TTLs (negative caching), using the
+ TTLCache from Memoization.py. Denials usually get a shorter TTL so a fresh login is picked up quickly.
+.Bulk checks: check_many() answers what it can from the cache and sends all the misses to the backend in a
+ single lookup_many() round trip.
+.Request coalescing: When several threads ask about the same user at once, only one backend lookup runs;
+ the others wait for its answer (often called "single flight").
+.Invalidation: invalidate() also detaches lookups already in flight, and bumps a generation counter so their
+ answers, possibly read before the logout, are returned to the callers that asked but never cached.
+
+A backend is any object with lookup_many(user_ids) -> {user_id: bool}. SessionStoreStub is a local,
+in-memory backend with simulated latency for examples and tests. """
+
+import functools
+import threading
+import time
+
+from Memoization import TTLCache
+
+_MISSING = object()
+
+
+""" 1-Backends """
+
+
+class SessionStoreStub:
+    def __init__(self, sessions=None, latency=0.01):
+        self.sessions = dict(sessions or {})
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def lookup_many(self, user_ids):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)  # One round trip, no matter how many users
+        return {user_id: bool(self.sessions.get(user_id)) for user_id in user_ids}
+
+
+""" 2-In-Flight Lookups
+Waiters block on the Event; the thread that started the lookup fills in the result or the error. """
+
+
+class _Flight:
+    __slots__ = ("done", "allowed", "error", "generation")
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.done = threading.Event()
+        self.allowed = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.allowed
+
+
+""" 3-The Authorizer """
+
+
+class Authorizer:
+    def __init__(self, backend, ttl=60.0, negative_ttl=5.0, maxsize=10_000):
+        self.backend = backend
+        self._allowed = TTLCache(maxsize, ttl=ttl)
+        self._denied = TTLCache(maxsize, ttl=negative_ttl)
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._generation = 0  # Bumped by invalidate(); lookups started in an older generation are not cached
+        self.backend_calls = self.coalesced = 0
+
+    def _cached(self, user_id):
+        if self._allowed.get(user_id, _MISSING) is not _MISSING:
+            return True
+        if self._denied.get(user_id, _MISSING) is not _MISSING:
+            return False
+        return _MISSING
+
+    def _store(self, user_id, allowed):
+        (self._allowed if allowed else self._denied).put(user_id, True)
+
+    def check(self, user_id):
+        return self.check_many([user_id])[user_id]
+
+    def check_many(self, user_ids):
+        """Decide for many users at once; at most one backend round trip per call."""
+        decisions = {}
+        waiting = {}
+        mine = {}
+        with self._lock:
+            for user_id in dict.fromkeys(user_ids):
+                decision = self._cached(user_id)
+                if decision is not _MISSING:
+                    decisions[user_id] = decision
+                elif user_id in self._in_flight:
+                    waiting[user_id] = self._in_flight[user_id]
+                    self.coalesced += 1
+                else:
+                    mine[user_id] = self._in_flight[user_id] = _Flight(self._generation)
+            if mine:
+                self.backend_calls += 1
+
+        if mine:
+            try:
+                answers = self.backend.lookup_many(list(mine))
+            except BaseException as exc:
+                with self._lock:
+                    for user_id, flight in mine.items():
+                        flight.error = exc
+                        self._land(user_id, flight)
+                raise
+            with self._lock:
+                for user_id, flight in mine.items():
+                    flight.allowed = bool(answers.get(user_id, False))
+                    if flight.generation == self._generation:
+                        self._store(user_id, flight.allowed)
+                    self._land(user_id, flight)
+                    decisions[user_id] = flight.allowed
+
+        for user_id, flight in waiting.items():
+            decisions[user_id] = flight.wait()
+        return {user_id: decisions[user_id] for user_id in dict.fromkeys(user_ids)}
+
+    def _land(self, user_id, flight):
+        """Finish a flight; the lock must be held. An invalidate() may already have detached it."""
+        if self._in_flight.get(user_id) is flight:
+            del self._in_flight[user_id]
+        flight.done.set()
+
+    def invalidate(self, user_id=None):
+        """Forget one user's cached decision, or all of them (e.g. after a logout), including lookups in flight."""
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._allowed.clear()
+                self._denied.clear()
+                self._in_flight.clear()
+            else:
+                self._allowed.discard(user_id)
+                self._denied.discard(user_id)
+                self._in_flight.pop(user_id, None)
+
+    def stats(self):
+        allowed, denied = self._allowed.info(), self._denied.info()
+        return {
+            "backend_calls": self.backend_calls,
+            "coalesced": self.coalesced,
+            "cache_hits": allowed.hits + denied.hits,
+            "cached_allowed": allowed.currsize,
+            "cached_denied": denied.currsize,
+        }
+
+    # Same contract as Decorators.require_login: the first argument is the user, PermissionError on denial
+
+    def require_login(self, func):
+        @functools.wraps(func)
+        def wrapper(user, *args, **kwargs):
+            user_id = user.get("username") if isinstance(user, dict) else user
+            if not self.check(user_id):
+                raise PermissionError("User not logged in")
+            return func(user, *args, **kwargs)
+        return wrapper
+
+
+if __name__ == "__main__":
+    store = SessionStoreStub({"john": True, "tina": True}, latency=0.05)
+    auth = Authorizer(store, ttl=30, negative_ttl=2)
+
+    @auth.require_login
+    def view_dashboard(user):
+        return "Welcome to the dashboard!"
+
+    print(view_dashboard({"username": "john", "logged_in": True}))
+    try:
+        view_dashboard({"username": "mallory"})
+    except PermissionError as exc:
+        print("mallory:", exc)
+
+    print(auth.check_many(["john", "tina", "mallory", "bob", "alice"]))
+
+    threads = [threading.Thread(target=auth.check, args=("carol",)) for _ in range(50)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"50 concurrent checks for carol took {time.perf_counter() - start:.3f}s")
+    print(auth.stats(), "store round trips:", store.calls)
@@ -0,0 +1,128 @@
+""" CHUNKED GENERATORS IN PYTHON """
+
+""" Definition
+Generators.count_up_to and infinite_numbers yield one Python int per next() call. Each item costs a generator
+resume, an int object and a trip through the consumer's loop. With tens of millions of items that
+interpreter overhead is most of the run time.
+
+Chunked generators yield BLOCKS of values instead:
+
+.list chunks (default): list(range(...)) is built in C and sum()/max()/sorted() on a list are the fastest
+ stdlib consumers, so this is the best choice for throughput without extra packages.
+.array.array chunks: A compact buffer of machine integers (8 bytes per item instead of a pointer plus an int
+ object). Filling and reading one boxes every value, so it saves memory rather than time.
+.NumPy chunks (optional): If NumPy is installed, chunks can be numpy arrays (np.arange), so the consumer can
+ use vectorized operations on them.
+.Flattening adapter: flatten_chunks() turns chunks back into single items for code that expects the old
+ element-by-element generators. It uses itertools.chain.from_iterable, which runs in C.
+
+The consumer decides how to use each chunk: sum(chunk), chunk.sum(), bytes(chunk), file.write(chunk)... """
+
+import array
+import itertools
+import time
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; list and array.array chunks always work
+    np = None
+
+DEFAULT_CHUNK_SIZE = 8192
+KINDS = ("list", "array", "numpy")
+
+
+def _chunk_factory(kind, typecode):
+    if kind == "list":
+        return lambda start, stop: list(range(start, stop))
+    if kind == "array":
+        return lambda start, stop: array.array(typecode, range(start, stop))
+    if kind == "numpy":
+        if np is None:
+            raise ImportError("kind='numpy' needs NumPy installed")
+        return lambda start, stop: np.arange(start, stop, dtype=np.int64)
+    raise ValueError(f"kind must be one of {KINDS}, got {kind!r}")
+
+
+""" 1-Chunked Versions of the Generators """
+
+
+def count_up_to_chunks(n, chunk_size=DEFAULT_CHUNK_SIZE, kind="list", typecode="q"):
+    """Same values as Generators.count_up_to(n) (1..n), in chunks of chunk_size."""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+    make_chunk = _chunk_factory(kind, typecode)
+    count = 1
+    while count <= n:
+        stop = min(count + chunk_size, n + 1)
+        yield make_chunk(count, stop)
+        count = stop
+
+
+def infinite_numbers_chunks(start=0, chunk_size=DEFAULT_CHUNK_SIZE, kind="list", typecode="q"):
+    """Same values as Generators.infinite_numbers(start), in chunks of chunk_size."""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+    make_chunk = _chunk_factory(kind, typecode)
+    while True:
+        yield make_chunk(start, start + chunk_size)
+        start += chunk_size
+
+
+""" 2-Adapters """
+
+
+def flatten_chunks(chunks):
+    """Re-flatten chunks into single items for existing element-wise consumers."""
+    return itertools.chain.from_iterable(chunks)
+
+
+def rechunk(items, chunk_size=DEFAULT_CHUNK_SIZE, typecode="q"):
+    """The other direction: group any iterable of ints into array.array chunks."""
+    iterator = iter(items)
+    while True:
+        chunk = array.array(typecode, itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+""" 3-Benchmark
+Summing 1..n element-wise, chunk-wise and through the flattening adapter. """
+
+
+def count_up_to(n):
+    count = 1
+    while count <= n:
+        yield count
+        count += 1
+
+
+def benchmark(n=5_000_000, chunk_size=DEFAULT_CHUNK_SIZE):
+    variants = [
+        ("element-wise count_up_to", lambda: sum(count_up_to(n))),
+        ("flatten_chunks (list)", lambda: sum(flatten_chunks(count_up_to_chunks(n, chunk_size)))),
+        ("chunked list, sum per chunk", lambda: sum(sum(c) for c in count_up_to_chunks(n, chunk_size))),
+        ("chunked array, sum per chunk",
+         lambda: sum(sum(c) for c in count_up_to_chunks(n, chunk_size, kind="array"))),
+    ]
+    if np is not None:
+        variants.append(("chunked numpy, chunk.sum()",
+                         lambda: int(sum(c.sum() for c in count_up_to_chunks(n, chunk_size, kind="numpy")))))
+    expected = n * (n + 1) // 2
+    print(f"{'consumer':<32}{'ns/item':>10}{'Mitems/s':>10}")
+    for label, run in variants:
+        start = time.perf_counter()
+        total = run()
+        elapsed = time.perf_counter() - start
+        assert total == expected, label
+        print(f"{label:<32}{elapsed / n * 1e9:>10.1f}{n / elapsed / 1e6:>10.1f}")
+    if np is None:
+        print("(NumPy not installed, numpy chunks skipped)")
+
+
+if __name__ == "__main__":
+    for chunk in count_up_to_chunks(10, chunk_size=4, kind="array"):
+        print(chunk)
+    print(list(flatten_chunks(count_up_to_chunks(5, chunk_size=2))))
+    print(next(infinite_numbers_chunks(100, chunk_size=5)))
+    benchmark()
@@ -0,0 +1,201 @@
+""" CLASS-BASED DECORATORS THAT WORK ON METHODS """
+
+""" Definition
+Decorators.DecoratorClass keeps the function in the instance __dict__ and has no __get__ method. Two problems
+follow:
+
+.Methods break: A class instance stored on a class is not a descriptor, so obj.method returns the decorator
+ itself and self is never passed to the function.
+.Per-call cost: Every call looks self.func up in a dict and goes through a Python-level __call__.
+
+FunctionDecorator is a reusable base class that fixes both:
+
+.__slots__: The wrapped function lives in a slot, there is no per-instance __dict__.
+.Descriptor: __get__ binds the decorator to the instance with types.MethodType, which is implemented in C,
+ exactly as a plain function does. The bound method is not cached: a copy in the instance __dict__ goes stale
+ in copy.copy(obj) and a WeakKeyDictionary keeps every instance alive (its values point back at their keys)
+ while looking up slower than MethodType builds a new one. The benchmark times that cache too.
+.classmethod/staticmethod: Decorating either (in any order) binds to the class or to nothing as expected.
+.Metadata: __name__ and __qualname__ are copied into slots, __doc__ is read from the wrapped function and
+ __wrapped__ is set, so inspect.signature() and help() see the original.
+
+Per call, FunctionDecorator costs about what DecoratorClass did, a Python-level __call__ more than a
+closure, and binding a method on every lookup adds one Python-level __get__. In exchange it works on methods,
+classmethods and staticmethods and carries state and methods of its own; bind once (m = obj.method) in hot
+loops.
+
+Subclasses override __call__(self, *args, **kwargs) and call self.__wrapped__. """
+
+import time
+import types
+import weakref
+
+
+class FunctionDecorator:
+    __slots__ = ("__wrapped__", "__name__", "__qualname__", "_kind", "__weakref__")
+
+    def __init__(self, func):
+        if isinstance(func, (classmethod, staticmethod)):
+            self._kind = type(func)
+            func = func.__func__
+        else:
+            self._kind = None
+        if not callable(func):
+            raise TypeError(f"{type(self).__name__} expects a callable, got {type(func).__name__}")
+        self.__wrapped__ = func
+        self.__name__ = getattr(func, "__name__", type(func).__name__)
+        self.__qualname__ = getattr(func, "__qualname__", self.__name__)
+
+    def __call__(self, *args, **kwargs):
+        return self.__wrapped__(*args, **kwargs)
+
+    def __get__(self, instance, owner=None):
+        if self._kind is staticmethod:
+            return self
+        if self._kind is classmethod:
+            return types.MethodType(self, owner if owner is not None else type(instance))
+        if instance is None:
+            return self
+        return types.MethodType(self, instance)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.__doc__ = _wrapped_doc
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.__qualname__}>"
+
+
+# A class docstring would shadow the function's one, so __doc__ is a property on every subclass
+_wrapped_doc = property(lambda self: getattr(self.__wrapped__, "__doc__", None))
+FunctionDecorator.__doc__ = _wrapped_doc
+
+
+""" Example subclasses
+Each subclass only adds its own slots and its own __call__. """
+
+
+class CallCounter(FunctionDecorator):
+    __slots__ = ("calls",)
+
+    def __init__(self, func):
+        super().__init__(func)
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.__wrapped__(*args, **kwargs)
+
+
+class Announce(FunctionDecorator):
+    __slots__ = ()
+
+    def __call__(self, *args, **kwargs):
+        print(f"Class-based decorator called for {self.__wrapped__.__name__}")
+        return self.__wrapped__(*args, **kwargs)
+
+
+""" Benchmark
+Per-call cost of a silent closure decorator (decorator_function without the prints), the original
+DecoratorClass pattern and FunctionDecorator, on a plain function and on a method. "weak-cached" is
+FunctionDecorator with the bound methods cached in a WeakKeyDictionary, the cache FunctionDecorator leaves out. """
+
+
+def _closure_decorator(original_function):
+    def wrapper_function(*args, **kwargs):
+        return original_function(*args, **kwargs)
+    return wrapper_function
+
+
+class _WeakCachedDecorator(FunctionDecorator):
+    """Benchmark only: the cached values reference their keys, so no instance is ever freed."""
+    __slots__ = ("_bound",)
+
+    def __init__(self, func):
+        super().__init__(func)
+        self._bound = weakref.WeakKeyDictionary()
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return self._bound[instance]
+        except KeyError:
+            bound = self._bound[instance] = types.MethodType(self, instance)
+            return bound
+
+
+class _DictDecoratorClass:
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+
+def _per_call_ns(func, calls):
+    start = time.perf_counter_ns()
+    for i in range(calls):
+        func(i)
+    return (time.perf_counter_ns() - start) / calls
+
+
+def benchmark(calls=300_000):
+    def target(x):
+        return x
+
+    rows = [("undecorated", target), ("closure", _closure_decorator(target)),
+            ("DecoratorClass", _DictDecoratorClass(target)), ("FunctionDecorator", FunctionDecorator(target))]
+    print(f"{'function call':<20}{'ns/call':>10}")
+    for label, func in rows:
+        print(f"{label:<20}{_per_call_ns(func, calls):>10.0f}")
+
+    class Methods:
+        def plain(self, x):
+            return x
+
+        closure = _closure_decorator(plain)
+        slotted = FunctionDecorator(plain)
+        weak_cached = _WeakCachedDecorator(plain)
+
+    obj = Methods()
+    print(f"{'method call':<20}{'ns/call':>10}")
+    for label in ("plain", "closure", "slotted", "weak_cached"):
+        print(f"{label:<20}{_per_call_ns(getattr(obj, label), calls):>10.0f}  (bound once)")
+        start = time.perf_counter_ns()
+        for i in range(calls):
+            getattr(obj, label)(i)
+        print(f"{'':<20}{(time.perf_counter_ns() - start) / calls:>10.0f}  (looked up every call)")
+
+
+if __name__ == "__main__":
+    @Announce
+    def say_hello():
+        """Print a greeting."""
+        print("Hello, world!")
+
+    say_hello()
+    print(say_hello.__name__, "-", say_hello.__doc__)
+
+    class Greeter:
+        def __init__(self, name):
+            self.name = name
+
+        @CallCounter
+        def greet(self):
+            return f"Hello, {self.name}!"
+
+        @CallCounter
+        @classmethod
+        def create(cls, name):
+            return cls(name)
+
+        @staticmethod
+        @CallCounter
+        def shout(text):
+            return text.upper()
+
+    g = Greeter.create("Jonathan")
+    print(g.greet(), g.greet(), Greeter.shout("hi"), g.shout("there"))
+    print("greet calls:", Greeter.greet.calls, "create calls:", Greeter.__dict__["create"].calls)
+    benchmark()
@@ -0,0 +1,225 @@
+""" CONCURRENT REPEAT DECORATOR IN PYTHON """
+
+""" Definition
+Decorators.repeat(n) calls the wrapped function n times one after another and throws the results away.
+That shape is common for load generation and warm-up, where the n calls are independent and mostly wait
+on I/O, so running them one by one wastes time.
+
+This version of repeat takes an execution mode:
+
+.serial: One call after another on the caller's thread (the original behaviour).
+.thread: The calls run on a ThreadPoolExecutor, so blocking I/O overlaps. max_workers sets the number of
+ threads; the default is one per call, at most 32. That is more than ThreadPoolExecutor's own default of
+ min(32, cpu count + 4), because these calls are expected to wait on I/O rather than use a core.
+.process: The calls run on a ProcessPoolExecutor, for CPU-bound work. The function must be defined at module
+ level so the worker processes can import it.
+.asyncio: Coroutine functions are gathered on an event loop; plain functions run on a thread pool driven by the loop.
+
+Every mode returns a RepeatResult with the results and exceptions in call order, the wall-clock time and
+per-call latency statistics. Comparing the two shows how much the calls overlapped. """
+
+import asyncio
+import functools
+import importlib
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+MODES = ("serial", "thread", "process", "asyncio")
+
+
+""" 1-The Result
+results[i] and errors[i] belong to call i; exactly one of them is set (results[i] is None on failure). """
+
+
+class RepeatResult:
+    def __init__(self, results, errors, latencies, wall):
+        self.results = results
+        self.errors = errors
+        self.latencies = latencies
+        self.wall = wall
+
+    @property
+    def ok(self):
+        return all(error is None for error in self.errors)
+
+    def raise_first(self):
+        for error in self.errors:
+            if error is not None:
+                raise error
+
+    def stats(self):
+        ordered = sorted(self.latencies)
+        n = len(ordered)
+        if not n:
+            return {"calls": 0, "wall_s": self.wall}
+        busy = sum(ordered)
+        return {
+            "calls": n,
+            "failed": sum(error is not None for error in self.errors),
+            "wall_s": self.wall,
+            "busy_s": busy,
+            "overlap": busy / self.wall if self.wall else 0.0,
+            "min_s": ordered[0],
+            "mean_s": busy / n,
+            "p50_s": ordered[(n - 1) // 2],
+            "p95_s": ordered[min(n - 1, int(n * 0.95))],
+            "max_s": ordered[-1],
+        }
+
+    def __repr__(self):
+        stats = self.stats()
+        return (f"RepeatResult(calls={stats['calls']}, failed={stats.get('failed', 0)}, "
+                f"wall={self.wall:.4f}s, overlap={stats.get('overlap', 0.0):.1f}x)")
+
+
+""" 2-Timed Calls
+Each call is timed where it runs; exceptions are returned, not raised, so one failure does not hide the rest.
+Processes receive the function by module and qualified name and unwrap the repeat wrapper themselves,
+because pickle cannot send the original function once its module-level name points at the wrapper. """
+
+
+def _timed_call(func, args, kwargs):
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs), None, time.perf_counter() - start
+    except Exception as exc:
+        return None, exc, time.perf_counter() - start
+
+
+def _resolve(module_name, qualname):
+    obj = importlib.import_module(module_name)
+    for part in qualname.split("."):
+        obj = getattr(obj, part)
+    while getattr(obj, "__repeat_wrapper__", False):
+        obj = obj.__wrapped__
+    return obj
+
+
+def _timed_call_by_name(module_name, qualname, args, kwargs):
+    return _timed_call(_resolve(module_name, qualname), args, kwargs)
+
+
+async def _timed_await(func, args, kwargs):
+    start = time.perf_counter()
+    try:
+        return await func(*args, **kwargs), None, time.perf_counter() - start
+    except Exception as exc:
+        return None, exc, time.perf_counter() - start
+
+
+def _thread_workers(n, max_workers):
+    """Thread pool size: the caller's choice, else one thread per call, at most 32 (not cpu count + 4 as
+    ThreadPoolExecutor's default: the calls are assumed to wait on I/O)."""
+    return max_workers or min(n, 32)
+
+
+async def _run_asyncio(func, n, args, kwargs, max_workers):
+    if n == 0:
+        return []
+    if asyncio.iscoroutinefunction(func):
+        limit = asyncio.Semaphore(max_workers or n)
+
+        async def one():
+            async with limit:
+                return await _timed_await(func, args, kwargs)
+        return await asyncio.gather(*(one() for _ in range(n)))
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=_thread_workers(n, max_workers)) as pool:
+        calls = [loop.run_in_executor(pool, _timed_call, func, args, kwargs) for _ in range(n)]
+        return await asyncio.gather(*calls)
+
+
+def _run(func, n, mode, max_workers, args, kwargs):
+    if n == 0:
+        return []
+    if mode == "serial":
+        if asyncio.iscoroutinefunction(func):
+            return [asyncio.run(_timed_await(func, args, kwargs)) for _ in range(n)]
+        return [_timed_call(func, args, kwargs) for _ in range(n)]
+    if mode == "thread":
+        with ThreadPoolExecutor(max_workers=_thread_workers(n, max_workers)) as pool:
+            return list(pool.map(lambda _: _timed_call(func, args, kwargs), range(n)))
+    if mode == "process":
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_timed_call_by_name, func.__module__, func.__qualname__, args, kwargs)
+                       for _ in range(n)]
+            return [future.result() for future in futures]
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_run_asyncio(func, n, args, kwargs, max_workers))
+    raise RuntimeError("repeat(mode='asyncio') called inside a running event loop; await wrapper.run_async() instead")
+
+
+""" 3-The Decorator Factory """
+
+
+def repeat(n, mode="serial", max_workers=None):
+    if n < 0:
+        raise ValueError("n must be >= 0")
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+
+    def decorator(func):
+        if mode == "process" and "<locals>" in func.__qualname__:
+            raise ValueError("mode='process' needs a module-level function so workers can import it")
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcomes = _run(func, n, mode, max_workers, args, kwargs)
+            return _collect(outcomes, time.perf_counter() - start)
+
+        async def run_async(*args, **kwargs):
+            start = time.perf_counter()
+            outcomes = await _run_asyncio(func, n, args, kwargs, max_workers)
+            return _collect(outcomes, time.perf_counter() - start)
+
+        wrapper.run_async = run_async
+        wrapper.__repeat_wrapper__ = True
+        return wrapper
+    return decorator
+
+
+def _collect(outcomes, wall):
+    results, errors, latencies = [], [], []
+    for result, error, latency in outcomes:
+        results.append(result)
+        errors.append(error)
+        latencies.append(latency)
+    return RepeatResult(results, errors, latencies, wall)
+
+
+""" 4-Example
+Twenty simulated 50ms requests in each mode, plus a CPU-bound function in processes. """
+
+
+def fake_request(i=0):
+    time.sleep(0.05)
+    return i
+
+
+def cpu_task(n=200_000):
+    return sum(x * x for x in range(n))
+
+
+async def fake_async_request():
+    await asyncio.sleep(0.05)
+    return "done"
+
+
+if __name__ == "__main__":
+    for mode in ("serial", "thread", "asyncio"):
+        result = repeat(20, mode=mode)(fake_request)(7)
+        print(f"{mode:<8}", result)
+
+    print("asyncio ", repeat(20, mode="asyncio")(fake_async_request)())
+
+    cpu_task = repeat(4, mode="process")(cpu_task)
+    print("process ", cpu_task(), cpu_task().stats())
+
+    @repeat(3)
+    def greet():
+        print("Hi!")
+
+    greet()
@@ -0,0 +1,167 @@
+""" FLATTENING DECORATOR STACKS IN PYTHON """
+
+""" Definition
+In Decorators.py, stacking @decorator_one on @decorator_two builds a wrapper around a wrapper. Every layer
+adds a Python frame and repacks *args/**kwargs, so with five or six layers the wrappers can cost more than
+the function they wrap.
+
+Most of these decorators follow the same "before/after" shape: run something before the call, call the
+function, maybe run something after with the result. This module describes such a decorator as data
+(a Layer with optional before/after hooks) and compiles a whole chain of them into ONE generated wrapper:
+
+.One frame: The hooks are called inline from a single wrapper, in the same order the stack would run them.
+.One repack: *args/**kwargs are collected once and passed straight through.
+.Introspection: functools.wraps keeps __name__/__doc__ and __wrapped__ points at the original function.
+ The layers are kept on wrapper.__layers__.
+
+Hook signatures:
+before(func, args, kwargs)          -> ignored return value
+after(func, args, kwargs, result)   -> the (possibly replaced) result """
+
+import functools
+import time
+import weakref
+
+
+""" 1-Layers
+A Layer is an ordinary decorator too, so it can still be used on its own with @ syntax. """
+
+
+class Layer:
+    __slots__ = ("before", "after", "name")
+
+    def __init__(self, before=None, after=None, name=None):
+        if before is None and after is None:
+            raise ValueError("a Layer needs a before hook, an after hook or both")
+        self.before = before
+        self.after = after
+        self.name = name or getattr(before or after, "__name__", "layer")
+
+    def __call__(self, func):
+        return flatten(self)(func)
+
+    def __repr__(self):
+        return f"Layer({self.name!r})"
+
+
+def before(hook):
+    """Decorator form: @before turns a before(func, args, kwargs) hook into a Layer."""
+    return Layer(before=hook)
+
+
+def after(hook):
+    """Decorator form: @after turns an after(func, args, kwargs, result) hook into a Layer."""
+    return Layer(after=hook)
+
+
+""" 2-Code Generation
+The wrapper source is generated once per chain with every hook bound to a local name, so the call path has no
+loops and no per-layer indirection. Layers listed first are the outermost, matching top-to-bottom @ order:
+before hooks run first-to-last, after hooks last-to-first. """
+
+
+def _generate(layers):
+    lines = ["def wrapper(*args, **kwargs):"]
+    namespace = {}
+    for i, layer in enumerate(layers):
+        if layer.before is not None:
+            namespace[f"before_{i}"] = layer.before
+            lines.append(f"    before_{i}(func, args, kwargs)")
+    lines.append("    result = func(*args, **kwargs)")
+    for i in reversed(range(len(layers))):
+        if layers[i].after is not None:
+            namespace[f"after_{i}"] = layers[i].after
+            lines.append(f"    result = after_{i}(func, args, kwargs, result)")
+    lines.append("    return result")
+    return "\n".join(lines), namespace
+
+
+# Wrappers generated by flatten(). functools.wraps copies __dict__, so __layers__ alone does not tell a flattened
+# wrapper from an ordinary decorator stacked on top of one.
+_generated = weakref.WeakSet()
+
+
+def flatten(*layers):
+    """Compile a chain of Layers into a single decorator."""
+    flat = []
+    for layer in layers:
+        if isinstance(layer, (list, tuple)):
+            flat.extend(layer)
+        elif isinstance(layer, Layer):
+            flat.append(layer)
+        else:
+            raise TypeError(f"flatten() expects Layer objects, got {type(layer).__name__}")
+    source, hooks = _generate(flat)
+
+    def decorator(func):
+        # Flattening an already flattened function merges the chains instead of nesting them
+        if func in _generated:
+            return flatten(*flat, *func.__layers__)(func.__wrapped__)
+        namespace = dict(hooks, func=func)
+        label = getattr(func, "__qualname__", repr(func))  # partial objects and callable instances have none
+        exec(compile(source, f"<flatten {label}>", "exec"), namespace)
+        wrapper = functools.wraps(func)(namespace["wrapper"])
+        wrapper.__layers__ = tuple(flat)
+        _generated.add(wrapper)
+        return wrapper
+    return decorator
+
+
+""" 3-Example
+decorator_one and decorator_two from Decorators.py rewritten as layers. """
+
+
+@before
+def decorator_one(func, args, kwargs):
+    print("Decorator One")
+
+
+@before
+def decorator_two(func, args, kwargs):
+    print("Decorator Two")
+
+
+@flatten(decorator_one, decorator_two)
+def greet():
+    """Say hello."""
+    print("Hello!")
+
+
+""" 4-Microbenchmark
+Per-call cost of N nested closure wrappers vs one flattened wrapper running the same N no-op hooks. """
+
+
+def _noop_hook(func, args, kwargs):
+    pass
+
+
+def _nested_layer(func):
+    def wrapper(*args, **kwargs):
+        _noop_hook(func, args, kwargs)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def benchmark(max_layers=10, calls=200_000):
+    def target(x):
+        return x
+
+    print(f"{'layers':>6}{'nested ns':>12}{'flat ns':>10}{'speedup':>10}")
+    for n in range(1, max_layers + 1):
+        nested = target
+        for _ in range(n):
+            nested = _nested_layer(nested)
+        flat = flatten([Layer(before=_noop_hook) for _ in range(n)])(target)
+        timings = []
+        for func in (nested, flat):
+            start = time.perf_counter_ns()
+            for i in range(calls):
+                func(i)
+            timings.append((time.perf_counter_ns() - start) / calls)
+        print(f"{n:>6}{timings[0]:>12.0f}{timings[1]:>10.0f}{timings[0] / timings[1]:>9.2f}x")
+
+
+if __name__ == "__main__":
+    greet()
+    print(greet.__name__, greet.__doc__, greet.__wrapped__, greet.__layers__)
+    benchmark()
@@ -0,0 +1,182 @@
+""" FAST FIBONACCI NUMBERS IN PYTHON """
+
+""" Definition
+Generators.fibonacci and Iterators.Fibonacci both step a, b = b, a + b. Reaching the n-th term that way costs
+n big-integer additions on numbers with about 0.694*n bits, so F(10**7) is out of reach.
+
+This module is an engine both of them now use:
+
+.Fast doubling: fib(n) uses F(2k) = F(k) * (2*F(k+1) - F(k)) and F(2k+1) = F(k)**2 + F(k+1)**2, walking the
+ bits of n. That is O(log n) steps, so the cost is a few big multiplications on numbers of the final size.
+.Block cache: The pair (F(k), F(k+1)) at the start of every block of block_size indices is remembered in an
+ LRUCache from Memoization.py with a byte budget (these numbers get big). Sequential iteration records the
+ checkpoints it passes, and random access only adds forward from the start of its block.
+.Ranges: fib_range(start, stop, step) jumps straight to `start`, then steps with additions. A step > 1 uses
+ F(n+k) = F(k-1)*F(n) + F(k)*F(n+1), so it never walks the skipped terms. """
+
+import itertools
+import sys
+import time
+
+from Memoization import LRUCache
+
+
+def fib_pair(n):
+    """(F(n), F(n+1)) by fast doubling."""
+    if n < 0:
+        raise ValueError("n must be >= 0")
+    a, b = 0, 1
+    for bit in bin(n)[2:]:
+        c = a * ((b << 1) - a)
+        d = a * a + b * b
+        if bit == "1":
+            a, b = d, c + d
+        else:
+            a, b = c, d
+    return a, b
+
+
+def _advance(a, b, k, jump):
+    """Move the pair (F(n), F(n+1)) forward by k, given jump = (F(k-1), F(k), F(k+1))."""
+    f_km1, f_k, f_kp1 = jump
+    return f_km1 * a + f_k * b, f_k * a + f_kp1 * b
+
+
+def _pair_nbytes(pair):
+    return sys.getsizeof(pair[0]) + sys.getsizeof(pair[1])
+
+
+""" 1-The Engine """
+
+
+class FibonacciEngine:
+    def __init__(self, block_size=4096, max_blocks=1024, maxbytes=64 * 1024 * 1024):
+        if block_size < 1:
+            raise ValueError("block_size must be >= 1")
+        self.block_size = block_size
+        self._blocks = LRUCache(max_blocks, maxbytes=maxbytes, sizeof=_pair_nbytes)
+        self._blocks.put(0, (0, 1))
+
+    def _checkpoint(self, n):
+        """(index, pair) at the start of n's block, computed by fast doubling on a cache miss."""
+        block = n // self.block_size
+        pair = self._blocks.get(block)
+        if pair is None:
+            pair = fib_pair(block * self.block_size)
+            self._blocks.put(block, pair)
+        return block * self.block_size, pair
+
+    def pair(self, n):
+        if n < 0:
+            raise ValueError("n must be >= 0")
+        index, (a, b) = self._checkpoint(n)
+        for _ in range(n - index):  # Fewer than block_size additions
+            a, b = b, a + b
+        return a, b
+
+    def fib(self, n):
+        return self.pair(n)[0]
+
+    def iter_from(self, start=0):
+        """F(start), F(start+1), ... forever, recording block checkpoints on the way."""
+        a, b = self.pair(start)
+        n = start
+        size = self.block_size
+        blocks = self._blocks
+        countdown = -start % size  # Items until the next block boundary
+        while True:
+            if not countdown:
+                if n // size not in blocks:
+                    blocks.put(n // size, (a, b))
+                countdown = size
+            yield a
+            a, b = b, a + b
+            n += 1
+            countdown -= 1
+
+    def range(self, start, stop=None, step=1):
+        """F(i) for i in range(start, stop, step); stop=None means no end."""
+        if step < 1:
+            raise ValueError("step must be >= 1")
+        if stop is None:
+            indexes = itertools.count(start, step)
+        else:
+            indexes = range(start, stop, step)
+        if stop is not None and not len(indexes):
+            return
+        if step == 1:
+            values = self.iter_from(start)
+            yield from (values if stop is None else itertools.islice(values, len(indexes)))
+            return
+        f_k, f_kp1 = fib_pair(step)
+        jump = (f_kp1 - f_k, f_k, f_kp1)
+        a, b = self.pair(start)
+        for _ in indexes:
+            yield a
+            a, b = _advance(a, b, step, jump)
+
+    def upto(self, limit, inclusive=False):
+        """Terms from F(0) while they are below limit (or <= limit with inclusive=True)."""
+        for value in self.iter_from(0):
+            if value > limit or (value == limit and not inclusive):
+                return
+            yield value
+
+    def cache_info(self):
+        return self._blocks.info()
+
+
+engine = FibonacciEngine()
+
+
+def fib(n):
+    return engine.fib(n)
+
+
+def fib_range(start, stop=None, step=1):
+    return engine.range(start, stop, step)
+
+
+""" 2-Benchmarks
+Random access by iteration vs fast doubling, and the block cache at work. """
+
+
+def _iterative(n):
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def benchmark(max_exponent=7, iterative_up_to=5):
+    print(f"{'n':>10}{'iterative s':>14}{'doubling s':>12}{'digits':>10}")
+    for exponent in range(3, max_exponent + 1):
+        n = 10 ** exponent
+        fast, fast_time = _timed(lambda: fib_pair(n)[0])
+        if exponent <= iterative_up_to:
+            slow, slow_time = _timed(_iterative, n)
+            assert slow == fast
+            slow_text = f"{slow_time:>14.4f}"
+        else:
+            slow_text = f"{'(skipped)':>14}"
+        digits = int(fast.bit_length() * 0.30103) + 1
+        print(f"{n:>10}{slow_text}{fast_time:>12.4f}{digits:>10}")
+
+    engine = FibonacciEngine(block_size=1024)
+    _, cold = _timed(lambda: engine.fib(10 ** 6 + 500))
+    _, warm = _timed(lambda: engine.fib(10 ** 6 + 700))
+    print(f"engine.fib(10**6 + 500) cold {cold:.4f}s, fib(10**6 + 700) from cached block {warm:.4f}s")
+    _, window = _timed(lambda: sum(1 for _ in engine.range(10 ** 6, 10 ** 6 + 2000)))
+    print(f"fib_range(10**6, 10**6 + 2000) {window:.4f}s, cache {engine.cache_info()}")
+
+
+if __name__ == "__main__":
+    print(list(fib_range(0, 10)), list(fib_range(0, 30, 5)), fib(100))
+    print(list(engine.upto(10)), list(engine.upto(8, inclusive=True)))
+    benchmark()
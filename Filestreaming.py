@@ -0,0 +1,176 @@
+""" STREAMING LARGE FILES WITH MMAP IN PYTHON """
+
+""" Definition
+Generators.py names "Streaming Data: Handle large files" as an application, and Iterators.py loops over a file
+with `for line in file`. That loop reads the file through a buffer and creates a new bytes/str object for every
+line, copying each line at least once.
+
+This module streams a file through mmap instead:
+
+.Memory mapping: The OS maps the file into the address space and pages it in on demand, so a multi-GB file
+ costs no Python memory up front.
+.Zero-copy slices: Lines (or fixed-size records) are yielded as memoryview slices of the mapping. Nothing is
+ copied until the consumer asks for it (bytes(view), view.tobytes(), int(view), ...).
+.Shards: shard_ranges() splits a file into byte ranges that start and end on line boundaries, so several
+ worker processes can each stream their own part of the same file.
+
+The per-line work (a find() call and a slice) is done in Python, while `for line in file` splits lines in C.
+So mmap_lines wins when lines or records are long (kilobytes), where the copies dominate. For tens of millions
+of short lines plain open() is faster. The benchmark below shows both cases.
+
+A memoryview is only valid while the mapping is open. The generator closes the mapping when it finishes; if the
+consumer still holds views at that point, closing is left to the garbage collector. Copy what you keep. """
+
+import mmap
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _open_map(path):
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return None  # mmap cannot map an empty file
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _close(mapped, view):
+    view.release()
+    try:
+        mapped.close()
+    except BufferError:  # The consumer still holds slices; the mapping is freed with them
+        pass
+
+
+""" 1-Line and Record Sources """
+
+
+def mmap_lines(path, start=0, end=None, keepends=False, delimiter=b"\n"):
+    """Yield memoryview slices for the lines in [start, end) of the file."""
+    mapped = _open_map(path)
+    if mapped is None:
+        return
+    view = memoryview(mapped)
+    find = mapped.find
+    end = len(mapped) if end is None else min(end, len(mapped))
+    step = len(delimiter)
+    pos = start
+    try:
+        while pos < end:
+            found = find(delimiter, pos, end)
+            if found == -1:
+                yield view[pos:end]
+                return
+            yield view[pos:found + step if keepends else found]
+            pos = found + step
+    finally:
+        _close(mapped, view)
+
+
+def mmap_records(path, record_size, start=0, end=None):
+    """Yield fixed-size records; a short trailing record is yielded as it is."""
+    if record_size < 1:
+        raise ValueError("record_size must be >= 1")
+    mapped = _open_map(path)
+    if mapped is None:
+        return
+    view = memoryview(mapped)
+    end = len(mapped) if end is None else min(end, len(mapped))
+    try:
+        for pos in range(start, end, record_size):
+            yield view[pos:min(pos + record_size, end)]
+    finally:
+        _close(mapped, view)
+
+
+""" 2-Sharding
+Every cut point is moved forward to just after the next delimiter, so no line is split between two shards. """
+
+
+def shard_ranges(path, shards, delimiter=b"\n"):
+    if shards < 1:
+        raise ValueError("shards must be >= 1")
+    mapped = _open_map(path)
+    if mapped is None:
+        return []
+    try:
+        size = len(mapped)
+        bounds = [0]
+        for i in range(1, shards):
+            cut = i * size // shards
+            found = mapped.find(delimiter, max(cut - len(delimiter), bounds[-1]))
+            bounds.append(max(bounds[-1], size if found == -1 else found + len(delimiter)))
+        bounds.append(size)
+    finally:
+        mapped.close()
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+def _count_shard(path, start, end):
+    lines = nbytes = 0
+    for line in mmap_lines(path, start, end):
+        lines += 1
+        nbytes += len(line)
+    return lines, nbytes
+
+
+def parallel_count(path, workers=None):
+    """(lines, bytes without newlines) computed by one process per shard."""
+    workers = workers or os.cpu_count() or 1
+    ranges = shard_ranges(path, workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(_count_shard, [path] * len(ranges), *zip(*ranges))) if ranges else []
+    return sum(p[0] for p in parts), sum(p[1] for p in parts)
+
+
+""" 3-Benchmark
+Counting lines and bytes with `for line in open(...)` vs mmap_lines, for short and for long lines. """
+
+
+def _make_file(lines, width):
+    fd, path = tempfile.mkstemp(suffix=".txt")
+    row = (b"x" * (width - 1)) + b"\n"
+    with os.fdopen(fd, "wb") as file:
+        for _ in range(lines // 1000):
+            file.write(row * 1000)
+    return path
+
+
+def _plain(path):
+    lines = nbytes = 0
+    with open(path, "rb") as file:
+        for line in file:
+            lines += 1
+            nbytes += len(line) - 1
+    return lines, nbytes
+
+
+def benchmark(cases=((2_000_000, 40), (50_000, 16_384))):
+    print(f"{'file':<22}{'open() s':>10}{'mmap s':>10}{'shards s':>10}")
+    for lines, width in cases:
+        path = _make_file(lines, width)
+        try:
+            timings = []
+            for func in (_plain, lambda p: _count_shard(p, 0, None), parallel_count):
+                start = time.perf_counter()
+                result = func(path)
+                timings.append(time.perf_counter() - start)
+                assert result == (lines, lines * (width - 1)), result
+            label = f"{lines} x {width}B"
+            print(f"{label:<22}{timings[0]:>10.3f}{timings[1]:>10.3f}{timings[2]:>10.3f}")
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    fd, path = tempfile.mkstemp(suffix=".txt")
+    with os.fdopen(fd, "wb") as file:
+        file.write(b"alpha\nbeta\ngamma\ndelta\nepsilon")
+    try:
+        print([bytes(line) for line in mmap_lines(path)])
+        print(shard_ranges(path, 3), [bytes(r) for r in mmap_records(path, 8)])
+        print(parallel_count(path, workers=3))
+    finally:
+        os.remove(path)
+    benchmark()
@@ -87,11 +87,12 @@ Applications    Streaming data, pipelines, custom iterables	       Custom iterat
 """Example: Custom Range Function"""
 """Example: Fibonacci Sequence"""
 
+from Fastfibonacci import engine
+
 def fibonacci(limit):
-    a, b = 0, 1
-    while a < limit:
-        yield a
-        a, b = b, a + b
+    # Same terms as stepping a, b = b, a + b while a < limit; the engine also caches
+    # block checkpoints, and Fastfibonacci.fib(n) / fib_range(start, stop) give random access.
+    yield from engine.upto(limit)
 
 for num in fibonacci(10):
     print(num)
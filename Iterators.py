@@ -26,7 +26,9 @@ print(next(iterator))  # Output: 1
 print(next(iterator))  # Output: 2
 print(next(iterator))  # Output: 3
 
-"""2- Custom Iterator Class You can create a custom iterator by defining the __iter__() and __next__() methods."""
+"""2- Custom Iterator Class You can create a custom iterator by defining the __iter__() and __next__() methods.
+An iterator is used up as it goes. When you also need len(), indexing, slicing, `in` or reversed() over the same
+numbers, use RangeSequence from Rangesequence.py: a sequence that iter() can loop over any number of times."""
 
 class MyIterator:
     def __init__(self, start, end):
@@ -119,7 +121,8 @@ for _ in range(5):
     print(next(infinite))  # Output: 1, 2, 3, 4, 5
 
 
-""" 3-Chained Iteration Use libraries like itertools to combine or extend iterator functionalities."""
+""" 3-Chained Iteration Use libraries like itertools to combine or extend iterator functionalities.
+cycle() keeps a copy of everything it has seen; Ringbuffer.py cycles sequences without copying them."""
 
 from itertools import cycle
 
@@ -129,19 +132,20 @@ for item in cycle(["A", "B", "C"]):
 
 """ Custom Iterators Example """
 
+from Fastfibonacci import engine
+
 class Fibonacci:
     def __init__(self, limit):
         self.limit = limit
-        self.a, self.b = 0, 1
+        self.terms = engine.iter_from(0)  # Steps a, b = b, a + b; see Fastfibonacci.py
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        if self.a > self.limit:
+        value = next(self.terms)
+        if value > self.limit:
             raise StopIteration
-        value = self.a
-        self.a, self.b = self.b, self.a + self.b
         return value
 
 fib = Fibonacci(10)
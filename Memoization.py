@@ -0,0 +1,342 @@
+""" MEMOIZATION IN PYTHON """
+
+""" Definition
+Memoization is a caching technique where the result of a function call is stored and returned again when
+the same arguments come back, instead of recomputing it. It works best for pure functions (see
+Functionalprogramming.py): the output depends only on the inputs, so a stored result is always correct.
+
+Decorators.py lists caching as a cross-cutting concern but never implements it. This module adds a family
+of caching decorators that keep memory bounded:
+
+.LRU (Least Recently Used): Evicts the entry that was read or written longest ago.
+.LFU (Least Frequently Used): Evicts the entry with the fewest hits, oldest first on ties.
+.TTL (Time To Live): Entries expire a fixed number of seconds after they were stored.
+.Byte budget: Every cache can also be capped by the estimated size of its values, not only by count.
+
+All caches keep hit/miss/eviction/expiration counters and are safe to share between threads. The lock only
+guards the cache itself: two threads missing on the same key at once may both call the function, and the
+second result simply replaces the first. """
+
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+
+CacheInfo = namedtuple(
+    "CacheInfo", ["hits", "misses", "evictions", "expirations", "currsize", "maxsize", "nbytes", "maxbytes"]
+)
+
+_MISSING = object()
+_KWARGS_MARK = object()
+
+
+def _make_key(args, kwargs, typed):
+    """Build a hashable key from call arguments, like functools.lru_cache does."""
+    key = args
+    if kwargs:
+        key += (_KWARGS_MARK,) + tuple(kwargs.items())
+    if typed:
+        key += tuple(type(v) for v in args)
+        if kwargs:
+            key += tuple(type(v) for v in kwargs.values())
+    elif len(key) == 1 and type(key[0]) in (int, str):
+        return key[0]
+    return key
+
+
+""" 1-The Cache Base Class
+Stores key -> [value, nbytes, expires_at] and enforces the count, byte and TTL limits.
+Subclasses only decide which key to evict next through four small hooks. """
+
+
+class BoundedCache:
+    def __init__(self, maxsize=128, maxbytes=None, ttl=None, sizeof=sys.getsizeof, timer=time.monotonic):
+        if maxsize is not None and maxsize < 0:
+            raise ValueError("maxsize must be >= 0 or None")
+        if maxbytes is not None and maxbytes < 0:
+            raise ValueError("maxbytes must be >= 0 or None")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be > 0 or None")
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._timer = timer
+        self._data = {}
+        self._nbytes = 0
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    # Policy hooks
+    def _on_insert(self, key):
+        raise NotImplementedError
+
+    def _on_access(self, key):
+        raise NotImplementedError
+
+    def _on_remove(self, key):
+        raise NotImplementedError
+
+    def _victim(self):
+        raise NotImplementedError
+
+    def _remove(self, key):
+        entry = self._data.pop(key)
+        self._nbytes -= entry[1]
+        self._on_remove(key)
+        return entry
+
+    def _is_expired(self, entry):
+        return entry[2] is not None and self._timer() >= entry[2]
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self._is_expired(entry):
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._on_access(key)
+            return entry[0]
+
+    def put(self, key, value):
+        nbytes = self._sizeof(value) if self.maxbytes is not None else 0
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if self.maxsize == 0 or (self.maxbytes is not None and nbytes > self.maxbytes):
+                return  # Could never fit, do not flush the whole cache for it
+            expires = self._timer() + self.ttl if self.ttl is not None else None
+            while self._data and (
+                (self.maxsize is not None and len(self._data) >= self.maxsize)
+                or (self.maxbytes is not None and self._nbytes + nbytes > self.maxbytes)
+            ):
+                victim = self._victim()
+                if self._is_expired(self._data[victim]):
+                    self.expirations += 1
+                else:
+                    self.evictions += 1
+                self._remove(victim)
+            self._data[key] = [value, nbytes, expires]
+            self._nbytes += nbytes
+            self._on_insert(key)
+
+    def discard(self, key):
+        """Remove key if present; returns whether it was there."""
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+                return True
+            return False
+
+    def expire(self):
+        """Drop every expired entry now instead of waiting for it to be touched."""
+        with self._lock:
+            for key in [k for k, entry in self._data.items() if self._is_expired(entry)]:
+                self._remove(key)
+                self.expirations += 1
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._data):
+                self._remove(key)
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, self.expirations,
+                             len(self._data), self.maxsize, self._nbytes, self.maxbytes)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and not self._is_expired(entry)
+
+
+""" 2-LRU: An OrderedDict keeps keys from least to most recently used, so every hook is O(1). """
+
+
+class LRUCache(BoundedCache):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._order = OrderedDict()
+
+    def _on_insert(self, key):
+        self._order[key] = None
+
+    def _on_access(self, key):
+        self._order.move_to_end(key)
+
+    def _on_remove(self, key):
+        del self._order[key]
+
+    def _victim(self):
+        return next(iter(self._order))
+
+
+""" 3-LFU: Keys are grouped in buckets by hit count. The lowest non-empty bucket is tracked,
+so finding the victim is O(1) and ties are broken by insertion order within a bucket. """
+
+
+class LFUCache(BoundedCache):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._freq = {}
+        self._buckets = defaultdict(OrderedDict)
+        self._min_freq = 0
+
+    def _on_insert(self, key):
+        self._freq[key] = 1
+        self._buckets[1][key] = None
+        self._min_freq = 1
+
+    def _on_access(self, key):
+        freq = self._freq[key]
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[freq]
+            if self._min_freq == freq:
+                self._min_freq = freq + 1
+        self._freq[key] = freq + 1
+        self._buckets[freq + 1][key] = None
+
+    def _on_remove(self, key):
+        freq = self._freq.pop(key)
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[freq]
+            if self._min_freq == freq and self._buckets:
+                self._min_freq = min(self._buckets)
+
+    def _victim(self):
+        return next(iter(self._buckets[self._min_freq]))
+
+
+""" 4-TTL: LRU ordering plus a mandatory time to live. """
+
+
+class TTLCache(LRUCache):
+    def __init__(self, maxsize=128, ttl=60.0, **kwargs):
+        if ttl is None:
+            raise ValueError("TTLCache needs a ttl")
+        super().__init__(maxsize, ttl=ttl, **kwargs)
+
+
+_POLICIES = {"lru": LRUCache, "lfu": LFUCache, "ttl": TTLCache}
+
+
+""" 5-The Decorators
+The wrapper keeps the original metadata through functools.wraps, like the last example in Decorators.py,
+and exposes cache_info() and cache_clear() the same way functools.lru_cache does. """
+
+
+def memoize(maxsize=128, policy="lru", ttl=None, maxbytes=None, typed=False, sizeof=sys.getsizeof):
+    if callable(maxsize):  # Used as a bare @memoize
+        return memoize()(maxsize)
+    try:
+        cache_class = _POLICIES[policy]
+    except KeyError:
+        raise ValueError(f"Unknown cache policy {policy!r}, expected one of {sorted(_POLICIES)}") from None
+    if policy == "ttl" and ttl is None:
+        ttl = 60.0
+
+    def decorator(func):
+        cache = cache_class(maxsize, maxbytes=maxbytes, ttl=ttl, sizeof=sizeof)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = _make_key(args, kwargs, typed)
+            result = cache.get(key, _MISSING)
+            if result is _MISSING:
+                result = func(*args, **kwargs)
+                cache.put(key, result)
+            return result
+
+        wrapper.cache = cache
+        wrapper.cache_info = cache.info
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+
+def lru_cache(maxsize=128, **kwargs):
+    return memoize(maxsize, policy="lru", **kwargs)
+
+
+def lfu_cache(maxsize=128, **kwargs):
+    return memoize(maxsize, policy="lfu", **kwargs)
+
+
+def ttl_cache(ttl=60.0, maxsize=128, **kwargs):
+    return memoize(maxsize, policy="ttl", ttl=ttl, **kwargs)
+
+
+""" 6-Benchmark
+Recursive factorial from Functionalprogramming.py and the fibonacci generator from Generators.py,
+copied here so that importing those tutorial scripts does not run their examples. """
+
+
+def factorial(n):
+    if n == 0:
+        return 1
+    return n * factorial(n - 1)
+
+
+def fibonacci(limit):
+    a, b = 0, 1
+    while a < limit:
+        yield a
+        a, b = b, a + b
+
+
+def _bench(func, arg, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(arg)
+    return time.perf_counter() - start
+
+
+def benchmark(repeat=2000):
+    global factorial
+    plain_factorial = factorial
+    plain_fib = lambda limit: list(fibonacci(limit))
+
+    plain_times = [_bench(plain_factorial, 300, repeat), _bench(plain_fib, 10 ** 60, repeat)]
+
+    # Rebinding the module name makes the recursive calls hit the cache too
+    factorial = lru_cache(maxsize=512)(plain_factorial)
+    cached_fib = lru_cache(maxsize=64)(plain_fib)
+    try:
+        rows = [
+            ("factorial(300)", plain_times[0], _bench(factorial, 300, repeat)),
+            ("fibonacci(10**60)", plain_times[1], _bench(cached_fib, 10 ** 60, repeat)),
+        ]
+        print(f"{'workload':<20}{'plain (s)':>12}{'cached (s)':>12}{'speedup':>10}")
+        for name, plain, cached in rows:
+            print(f"{name:<20}{plain:>12.4f}{cached:>12.4f}{plain / cached:>9.1f}x")
+        print(factorial.cache_info())
+        print(cached_fib.cache_info())
+    finally:
+        factorial = plain_factorial
+
+
+if __name__ == "__main__":
+    @lfu_cache(maxsize=2)
+    def square(x):
+        print(f"computing {x}")
+        return x * x
+
+    square(2); square(2); square(3); square(4)  # 3 is evicted, 2 was used more often
+    print(square.__name__, square.cache_info())
+
+    benchmark()
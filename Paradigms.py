@@ -111,6 +111,7 @@ async def greet():
     print("World!")
 
 asyncio.run(greet())
+# Asyncrunner.py runs thousands of coroutines with bounded concurrency, batching queues, timeouts and a thread bridge.
 
 """ 8. Scripting
 Definition: Writing small, task-specific scripts for automation or system administration."""
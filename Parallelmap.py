@@ -0,0 +1,277 @@
+""" PARALLEL MAP, FILTER AND REDUCE ON A PROCESS POOL IN PYTHON """
+
+""" Definition
+threading_1.py advises multiprocessing for CPU-bound work, and Functionalprogramming.py shows map, filter and
+reduce. This module puts the two together:
+
+.Persistent pools: One ProcessPoolExecutor per pool size is started on first use and reused by every call
+ (starting processes costs tens of milliseconds). Asking for another size starts a second pool rather than
+ stopping one that a running call may still use. shutdown_pool() stops them all; it also runs at exit.
+.Chunks: Items are sent to the workers in lists, so the per-task cost (pickling, a round trip through a pipe) is
+ paid once per chunk rather than once per item.
+.Adaptive chunk size: The first chunks are small. Every finished chunk reports how long its items took, and the
+ next chunks are sized to take about `target` seconds each: big enough to hide the per-task cost, small enough
+ to keep all workers busy until the end.
+.Shared memory: A large array.array input is copied once into multiprocessing.shared_memory. Tasks then carry
+ only (name, start, stop) and every worker reads its slice straight from the shared block.
+.Order: ordered=True yields results in input order; ordered=False yields each chunk as soon as it is done.
+ parallel_reduce needs an associative function: chunks are reduced in the workers, then the partial results
+ are reduced, in order, in the parent.
+
+Functions (and the items) must be picklable, so use module-level functions rather than lambdas. """
+
+import array
+import atexit
+import collections
+import functools
+import itertools
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import resource_tracker, shared_memory
+
+SHARED_MEMORY_MIN_BYTES = 1 << 20  # Smaller arrays are cheaper to pickle than to share
+
+_pools = {}  # Worker count -> ProcessPoolExecutor
+
+
+def get_pool(workers=None):
+    workers = workers or os.cpu_count() or 1
+    pool = _pools.get(workers)
+    if pool is None:
+        # Workers must share the parent's resource tracker, or each one would report the shared blocks it
+        # attached to as leaked when it exits
+        resource_tracker.ensure_running()
+        pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return pool
+
+
+def shutdown_pool():
+    """Stop every pool; only call it when no parallel_* iterator is still being consumed."""
+    while _pools:
+        _pools.popitem()[1].shutdown()
+
+
+atexit.register(shutdown_pool)
+
+
+""" 1-Worker Side
+A runner takes a chunk of items and returns (result, seconds). Shared chunks are read through a cached
+attachment, so a worker maps each shared block once. """
+
+
+def _map_chunk(func, items):
+    start = time.perf_counter()
+    result = [func(item) for item in items]
+    return result, time.perf_counter() - start
+
+
+def _filter_chunk(predicate, items):
+    start = time.perf_counter()
+    result = [item for item in items if predicate(item)]
+    return result, time.perf_counter() - start
+
+
+def _reduce_chunk(func, items):
+    start = time.perf_counter()
+    result = functools.reduce(func, items)
+    return result, time.perf_counter() - start
+
+
+_attached = {}  # In a worker: shared block name -> (SharedMemory, typed memoryview)
+
+
+def _shared_chunk(runner, func, name, typecode, start, stop):
+    if name not in _attached:
+        for old, view in _attached.values():  # A new block means the previous call has finished
+            view.release()
+            old.close()
+        _attached.clear()
+        block = shared_memory.SharedMemory(name=name)
+        _attached[name] = (block, block.buf.cast(typecode))
+    return runner(func, _attached[name][1][start:stop])
+
+
+""" 2-Dispatch """
+
+
+class _SharedInput:
+    """An array.array copied into a shared memory block for the duration of one call."""
+
+    def __init__(self, data):
+        self.typecode = data.typecode
+        self.length = len(data)
+        self.block = shared_memory.SharedMemory(create=True, size=max(1, len(data) * data.itemsize))
+        self.block.buf[:len(data) * data.itemsize] = memoryview(data).cast("B")
+
+    def close(self):
+        self.block.close()
+        self.block.unlink()
+
+
+def _chunks(runner, func, items, shared, sizes):
+    """Yield (task args, item count), asking `sizes` for the size of every next chunk."""
+    if shared is not None:
+        start = 0
+        while start < shared.length:
+            stop = min(start + sizes(), shared.length)
+            yield (_shared_chunk, runner, func, shared.block.name, shared.typecode, start, stop), stop - start
+            start = stop
+        return
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, sizes()))
+        if not chunk:
+            return
+        yield (runner, func, chunk), len(chunk)
+
+
+def _dispatch(runner, func, items, ordered=True, chunksize=None, workers=None, target=0.02,
+              max_chunksize=100_000):
+    """Yield the runner's result per chunk. chunksize fixes the size; None adapts it to `target` seconds."""
+    pool = get_pool(workers)
+    in_flight = 2 * pool._max_workers
+    size = [chunksize or 16]
+
+    def sizes():
+        return size[0]
+
+    shared = None
+    if isinstance(items, array.array) and len(items) * items.itemsize >= SHARED_MEMORY_MIN_BYTES:
+        shared = _SharedInput(items)
+    pending = collections.OrderedDict()  # future -> item count, in submission order
+    try:
+        tasks = _chunks(runner, func, items, shared, sizes)
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < in_flight:
+                task = next(tasks, None)
+                if task is None:
+                    exhausted = True
+                else:
+                    args, count = task
+                    pending[pool.submit(*args)] = count
+            if not pending:
+                return
+            if ordered:
+                done = [next(iter(pending))]
+                wait(done)
+            else:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                count = pending.pop(future)
+                result, elapsed = future.result()
+                if chunksize is None and elapsed > 0:
+                    size[0] = max(1, min(max_chunksize, int(count * target / elapsed)))
+                yield result
+    finally:
+        # The consumer stopped early: drop the chunks still queued on the shared pool. Chunks the pool has
+        # already handed to a worker cannot be cancelled; shared ones then fail fast when they cannot attach.
+        for future in pending:
+            future.cancel()
+        if shared is not None:
+            shared.close()
+
+
+""" 3-The API
+parallel_map and parallel_filter return generators: close() (or contextlib.closing) stops a call early, cancels
+its queued chunks and frees its shared block at once instead of whenever the generator is collected. """
+
+
+def _flatten(chunks):
+    try:
+        for chunk in chunks:
+            yield from chunk
+    finally:
+        chunks.close()
+
+
+def parallel_map(func, items, ordered=True, chunksize=None, workers=None, target=0.02):
+    """Like map(func, items), computed on the process pool; returns an iterator."""
+    return _flatten(_dispatch(_map_chunk, func, items, ordered, chunksize, workers, target))
+
+
+def parallel_filter(predicate, items, ordered=True, chunksize=None, workers=None, target=0.02):
+    return _flatten(_dispatch(_filter_chunk, predicate, items, ordered, chunksize, workers, target))
+
+
+_NO_INITIAL = object()
+
+
+def parallel_reduce(func, items, initial=_NO_INITIAL, chunksize=None, workers=None, target=0.02):
+    """functools.reduce for an associative func: chunks are reduced in parallel, then combined in order."""
+    partials = _dispatch(_reduce_chunk, func, items, True, chunksize, workers, target)
+    if initial is _NO_INITIAL:
+        return functools.reduce(func, partials)
+    return functools.reduce(func, partials, initial)
+
+
+""" 4-Benchmark
+CPU-bound versions of the map/filter/reduce examples in Functionalprogramming.py. The speedup is bounded by
+the number of cores; with a single core the pool can only add its overhead (about 10-20% here). """
+
+
+def collatz_steps(n):
+    steps = 0
+    while n != 1:
+        n = n // 2 if n % 2 == 0 else 3 * n + 1
+        steps += 1
+    return steps
+
+
+def is_prime(n):
+    if n < 2:
+        return False
+    if n % 2 == 0:
+        return n == 2
+    d = 3
+    while d * d <= n:
+        if n % d == 0:
+            return False
+        d += 2
+    return True
+
+
+def add(x, y):
+    return x + y
+
+
+def square(x):
+    return x * x
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def benchmark(workers=None):
+    pool = get_pool(workers)
+    list(parallel_map(square, range(1000)))  # Start the workers before timing
+    numbers = range(1, 300_000)
+    candidates = range(10_000_000, 10_200_000)
+    big = array.array("q", range(5_000_000))
+    cases = [
+        ("map(collatz_steps)", lambda: list(map(collatz_steps, numbers)),
+         lambda: list(parallel_map(collatz_steps, numbers))),
+        ("map unordered", lambda: sorted(map(collatz_steps, numbers)),
+         lambda: sorted(parallel_map(collatz_steps, numbers, ordered=False))),
+        ("filter(is_prime)", lambda: list(filter(is_prime, candidates)),
+         lambda: list(parallel_filter(is_prime, candidates))),
+        ("reduce(add), shared array", lambda: functools.reduce(add, big),
+         lambda: parallel_reduce(add, big)),
+    ]
+    print(f"{pool._max_workers} worker processes")
+    print(f"{'workload':<28}{'builtin s':>10}{'parallel s':>12}{'speedup':>9}")
+    for label, serial, parallel in cases:
+        expected, serial_time = _timed(serial)
+        result, parallel_time = _timed(parallel)
+        assert result == expected
+        print(f"{label:<28}{serial_time:>10.2f}{parallel_time:>12.2f}{serial_time / parallel_time:>8.2f}x")
+
+
+if __name__ == "__main__":
+    print(list(parallel_map(square, range(10))), list(parallel_filter(is_prime, range(30))))
+    print(parallel_reduce(add, range(101)), parallel_reduce(add, array.array("i", range(400_000))))
+    benchmark()
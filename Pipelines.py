@@ -0,0 +1,294 @@
+""" STREAMING PIPELINES IN PYTHON """
+
+""" Definition
+Generators.py lists "Pipelines: Process data step-by-step in stages" as an application of generators. This
+module builds that: a pipeline is a chain of stages, and every stage is a generator that pulls from the stage
+before it, so items stream through one at a time and nothing is materialized.
+
+Stages:
+.source(iterable)       Where items come from.
+.map(func)              One output per input.
+.filter(predicate)      Keeps items where predicate(item) is true.
+.batch(size)            Groups items into lists of `size` (the last one may be shorter).
+.window(size, step)     Sliding windows (tuples) over the stream.
+.sink(func) / run()     Consumes the stream, calling func on every item.
+
+Parallel stages: map() and filter() accept workers=N with mode="thread" (I/O-bound work) or "process"
+(CPU-bound work, func must be picklable). At most `queue_size` items are in flight per stage, so a slow stage
+stops pulling from the one before it (backpressure) instead of buffering the whole stream. ordered=True keeps
+input order; ordered=False yields results as soon as they are ready.
+
+Every stage counts items in and out, busy time per item and wall time; report() prints throughput and
+latency per stage. """
+
+import collections
+import itertools
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+_clock = time.perf_counter_ns
+_END = object()
+
+
+""" 1-Stage Counters """
+
+
+class StageStats:
+    __slots__ = ("name", "items_in", "items_out", "busy_ns", "max_ns", "started_ns", "finished_ns")
+
+    def __init__(self, name):
+        self.name = name
+        self.items_in = self.items_out = self.busy_ns = self.max_ns = 0
+        self.started_ns = self.finished_ns = None
+
+    def record(self, elapsed_ns):
+        self.items_in += 1
+        self.busy_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+    def summary(self):
+        end = self.finished_ns if self.finished_ns is not None else _clock()
+        wall = (end - self.started_ns) / 1e9 if self.started_ns is not None else 0.0
+        return {
+            "stage": self.name,
+            "in": self.items_in,
+            "out": self.items_out,
+            "wall_s": wall,
+            "items_per_s": self.items_out / wall if wall else 0.0,
+            "mean_us": self.busy_ns / self.items_in / 1e3 if self.items_in else 0.0,
+            "max_us": self.max_ns / 1e3,
+        }
+
+
+def _timed_apply(func, item):
+    start = _clock()
+    result = func(item)
+    return result, _clock() - start
+
+
+def _timed_filter(predicate, item):
+    start = _clock()
+    keep = predicate(item)
+    return (keep, item), _clock() - start
+
+
+""" 2-Stage Generators
+Each takes the upstream iterator and its StageStats and yields downstream items. """
+
+
+def _serial_map(upstream, func, stats):
+    for item in upstream:
+        start = _clock()
+        result = func(item)
+        stats.record(_clock() - start)
+        stats.items_out += 1
+        yield result
+
+
+def _serial_filter(upstream, predicate, stats):
+    for item in upstream:
+        start = _clock()
+        keep = predicate(item)
+        stats.record(_clock() - start)
+        if keep:
+            stats.items_out += 1
+            yield item
+
+
+def _parallel(upstream, worker, func, stats, workers, mode, ordered, queue_size, unpack):
+    pool_class = ThreadPoolExecutor if mode == "thread" else ProcessPoolExecutor
+    upstream = iter(upstream)
+    with pool_class(max_workers=workers) as pool:
+        pending = collections.deque() if ordered else set()
+        add = pending.append if ordered else pending.add
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < queue_size:
+                item = next(upstream, _END)
+                if item is _END:
+                    exhausted = True
+                else:
+                    add(pool.submit(worker, func, item))
+            if not pending:
+                return
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                pending -= done
+            for future in done:
+                result, elapsed = future.result()
+                stats.record(elapsed)
+                yield from unpack(result, stats)
+
+
+def _unpack_map(result, stats):
+    stats.items_out += 1
+    yield result
+
+
+def _unpack_filter(result, stats):
+    keep, item = result
+    if keep:
+        stats.items_out += 1
+        yield item
+
+
+def _batch(upstream, size, stats):
+    upstream = iter(upstream)
+    while True:
+        chunk = list(itertools.islice(upstream, size))
+        if not chunk:
+            return
+        stats.items_in += len(chunk)
+        stats.items_out += 1
+        yield chunk
+
+
+def _window(upstream, size, step, stats):
+    window = collections.deque(maxlen=size)
+    since_last = 0
+    for item in upstream:
+        stats.items_in += 1
+        window.append(item)
+        since_last += 1
+        if len(window) == size and (stats.items_out == 0 or since_last >= step):
+            since_last = 0
+            stats.items_out += 1
+            yield tuple(window)
+
+
+def _source(iterable, stats):
+    for item in iterable:
+        stats.items_in += 1
+        stats.items_out += 1
+        yield item
+
+
+def _track(stage, stats):
+    """Wrap a stage so its wall time covers first pull to exhaustion."""
+    stats.started_ns = _clock()
+    try:
+        yield from stage
+    finally:
+        stats.finished_ns = _clock()
+
+
+""" 3-The Pipeline """
+
+
+class Pipeline:
+    def __init__(self, iterable=None, name="source"):
+        self._stages = []  # (stats, factory(upstream, stats) -> generator)
+        self._sink_stats = None
+        if iterable is not None:
+            self.source(iterable, name)
+
+    def _add(self, name, factory):
+        stats = StageStats(f"{len(self._stages)}:{name}")
+        self._stages.append((stats, factory))
+        return self
+
+    def source(self, iterable, name="source"):
+        if self._stages:
+            raise ValueError("a pipeline has exactly one source, and it comes first")
+        return self._add(name, lambda _upstream, stats: _source(iterable, stats))
+
+    def map(self, func, workers=1, mode="thread", ordered=True, queue_size=None, name=None):
+        return self._add(name or f"map({getattr(func, '__name__', 'func')})",
+                         self._parallel_or_serial(func, workers, mode, ordered, queue_size,
+                                                  _serial_map, _timed_apply, _unpack_map))
+
+    def filter(self, predicate, workers=1, mode="thread", ordered=True, queue_size=None, name=None):
+        return self._add(name or f"filter({getattr(predicate, '__name__', 'predicate')})",
+                         self._parallel_or_serial(predicate, workers, mode, ordered, queue_size,
+                                                  _serial_filter, _timed_filter, _unpack_filter))
+
+    @staticmethod
+    def _parallel_or_serial(func, workers, mode, ordered, queue_size, serial, worker, unpack):
+        if mode not in ("thread", "process"):
+            raise ValueError("mode must be 'thread' or 'process'")
+        if workers <= 1:
+            return lambda upstream, stats: serial(upstream, func, stats)
+        size = queue_size or workers * 2
+        return lambda upstream, stats: _parallel(upstream, worker, func, stats, workers, mode,
+                                                 ordered, size, unpack)
+
+    def batch(self, size, name=None):
+        if size < 1:
+            raise ValueError("size must be >= 1")
+        return self._add(name or f"batch({size})", lambda upstream, stats: _batch(upstream, size, stats))
+
+    def window(self, size, step=1, name=None):
+        if size < 1 or step < 1:
+            raise ValueError("size and step must be >= 1")
+        return self._add(name or f"window({size},{step})",
+                         lambda upstream, stats: _window(upstream, size, step, stats))
+
+    def __iter__(self):
+        if not self._stages:
+            raise ValueError("the pipeline has no source")
+        stream = None
+        for stats, factory in self._stages:
+            stream = _track(factory(stream, stats), stats)
+        return stream
+
+    def sink(self, func, name="sink"):
+        """Run the pipeline to the end, calling func on every output item."""
+        stats = StageStats(f"{len(self._stages)}:{name}")
+        stats.started_ns = _clock()
+        for item in self:
+            start = _clock()
+            func(item)
+            stats.record(_clock() - start)
+            stats.items_out += 1
+        stats.finished_ns = _clock()
+        self._sink_stats = stats
+        return self
+
+    def run(self):
+        """Drain the pipeline and return its outputs as a list."""
+        return list(self)
+
+    def stats(self):
+        summaries = [stats.summary() for stats, _ in self._stages]
+        if self._sink_stats is not None:
+            summaries.append(self._sink_stats.summary())
+        return summaries
+
+    def report(self):
+        print(f"{'stage':<28}{'in':>9}{'out':>9}{'items/s':>12}{'mean us':>10}{'max us':>10}")
+        for s in self.stats():
+            print(f"{s['stage']:<28}{s['in']:>9}{s['out']:>9}{s['items_per_s']:>12,.0f}"
+                  f"{s['mean_us']:>10.1f}{s['max_us']:>10.1f}")
+
+
+""" 4-Example
+An I/O-bound stage (simulated with sleep) run serially and with 8 threads. """
+
+
+def slow_square(x):
+    time.sleep(0.005)
+    return x * x
+
+
+def is_even(x):
+    return x % 2 == 0
+
+
+if __name__ == "__main__":
+    print(Pipeline(range(10)).map(lambda x: x * 10).filter(is_even).window(3).run())
+    print(Pipeline(range(10)).batch(4).run())
+
+    for workers, ordered in ((1, True), (8, True), (8, False)):
+        pipeline = (Pipeline(range(200))
+                    .map(slow_square, workers=workers, ordered=ordered)
+                    .filter(is_even)
+                    .batch(25))
+        out = []
+        start = time.perf_counter()
+        pipeline.sink(out.append)
+        print(f"\nworkers={workers} ordered={ordered}: {time.perf_counter() - start:.2f}s, "
+              f"first batch starts with {out[0][:3]}")
+        pipeline.report()
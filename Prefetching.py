@@ -0,0 +1,277 @@
+""" BACKGROUND PREFETCHING FOR ITERATORS IN PYTHON """
+
+""" Definition
+The iterators in Iterators.py (MyIterator, InfiniteNumbers, Fibonacci) compute each item inside __next__, on the
+consumer's thread. When producing an item is slow (I/O, parsing, a remote call), the consumer waits for the
+producer and the producer waits for the consumer; their costs add up.
+
+prefetch(iterable, depth=N) runs the producer ahead of the consumer:
+
+.Bounded buffer: A worker fills a queue of at most `depth` entries. When it is full the worker waits, so a fast
+ producer never runs unboundedly ahead (backpressure). chunk_size > 1 sends items in lists, which cuts the
+ per-item queue cost, and the buffer then holds up to depth * chunk_size items.
+.Worker: mode="thread" for I/O-bound producers; mode="process" for CPU-bound ones. In process mode the iterable
+ is sent to the child, so it must be picklable; generators are not, so pass a zero-argument callable that
+ returns the iterable instead (e.g. functools.partial(my_generator, arg)).
+.Errors: An exception raised by the producer is raised in the consumer at the same position in the stream,
+ after the items produced before it. Exhaustion ends the consumer's loop normally.
+.Cancellation: close() (or leaving a with block) stops the worker and discards what is buffered, even if the
+ producer is infinite. A Prefetcher that is simply dropped also tells its worker to stop when it is collected.
+.Metrics: stats() reports buffer occupancy (seen by the consumer at each fetch), how often the consumer found the
+ buffer empty (producer too slow) and how often the worker found it full (consumer too slow). """
+
+import functools
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+
+_ITEMS, _DONE, _ERROR = "items", "done", "error"
+_POLL = 0.05  # How often a blocked worker checks for cancellation, in seconds
+
+
+def _source(iterable):
+    if callable(iterable) and not hasattr(iterable, "__iter__"):
+        iterable = iterable()
+    return iter(iterable)
+
+
+def _put(buffer, message, stop, full_waits):
+    """Put without blocking past a cancellation; False if cancelled."""
+    try:
+        buffer.put_nowait(message)
+        return True
+    except queue.Full:
+        full_waits.value += 1
+    while not stop.is_set():
+        try:
+            buffer.put(message, timeout=_POLL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produce(iterable, buffer, stop, full_waits, chunk_size):
+    chunk = []
+    try:
+        items = _source(iterable)
+        while not stop.is_set():
+            chunk = []
+            for item in itertools.islice(items, chunk_size):
+                chunk.append(item)
+            if not chunk:
+                _put(buffer, (_DONE, None), stop, full_waits)
+                return
+            if not _put(buffer, (_ITEMS, chunk), stop, full_waits):
+                return
+    except BaseException as exc:
+        # The items of a partial chunk come before the error, as they would without prefetching
+        if chunk and not _put(buffer, (_ITEMS, chunk), stop, full_waits):
+            return
+        _put(buffer, (_ERROR, exc), stop, full_waits)
+
+
+def _picklable(exc):
+    try:
+        multiprocessing.reduction.ForkingPickler.dumps(exc)
+        return exc
+    except Exception:
+        return RuntimeError(f"producer raised an unpicklable exception: {exc!r}")
+
+
+def _produce_in_process(iterable, buffer, stop, full_waits, chunk_size):
+    def guarded():  # The exception is sent back to the parent, so it has to pickle
+        try:
+            yield from _source(iterable)
+        except BaseException as exc:
+            raise _picklable(exc) from None
+    try:
+        _produce(guarded, buffer, stop, full_waits, chunk_size)
+    finally:
+        if stop.is_set():
+            buffer.cancel_join_thread()  # Nobody will read what is left; do not block exit on it
+
+
+class _Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+
+""" 1-The Prefetcher """
+
+
+class Prefetcher:
+    def __init__(self, iterable, depth=8, mode="thread", chunk_size=1):
+        if depth < 1 or chunk_size < 1:
+            raise ValueError("depth and chunk_size must be >= 1")
+        if mode not in ("thread", "process"):
+            raise ValueError("mode must be 'thread' or 'process'")
+        self.depth = depth
+        self.mode = mode
+        self.chunk_size = chunk_size
+        self._chunk = iter(())
+        self._finished = False
+        self._items = self._fetches = self._empty_waits = 0
+        self._occupancy_total = self._occupancy_max = 0
+        if mode == "thread":
+            self._buffer = queue.Queue(maxsize=depth)
+            self._stop = threading.Event()
+            self._full_waits = _Counter()
+            self._worker = threading.Thread(
+                target=_produce, args=(iterable, self._buffer, self._stop, self._full_waits, chunk_size),
+                name="prefetch", daemon=True)
+        else:
+            self._buffer = multiprocessing.Queue(maxsize=depth)
+            self._stop = multiprocessing.Event()
+            self._full_waits = multiprocessing.Value("q", 0, lock=False)
+            self._worker = multiprocessing.Process(
+                target=_produce_in_process,
+                args=(iterable, self._buffer, self._stop, self._full_waits, chunk_size),
+                name="prefetch", daemon=True)
+        self._worker.start()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        for item in self._chunk:
+            self._items += 1
+            return item
+        if self._finished:
+            raise StopIteration
+        kind, payload = self._fetch()
+        if kind == _ITEMS:
+            self._chunk = iter(payload)
+            return next(self)
+        self.close()
+        if kind == _ERROR:
+            raise payload
+        raise StopIteration
+
+    def _fetch(self):
+        try:
+            occupancy = self._buffer.qsize()
+        except NotImplementedError:  # multiprocessing.Queue.qsize() on macOS
+            occupancy = 0
+        self._fetches += 1
+        self._occupancy_total += occupancy
+        if occupancy > self._occupancy_max:
+            self._occupancy_max = occupancy
+        try:
+            return self._buffer.get_nowait()
+        except queue.Empty:
+            self._empty_waits += 1
+        while True:
+            try:
+                return self._buffer.get(timeout=_POLL)
+            except queue.Empty:
+                if not self._worker.is_alive() and self._buffer.empty():
+                    return _ERROR, RuntimeError("prefetch worker died without finishing")
+
+    def close(self):
+        """Stop the worker and drop anything buffered. Safe to call more than once."""
+        if self._finished:
+            return
+        self._finished = True
+        self._chunk = iter(())
+        self._stop.set()
+        deadline = time.monotonic() + 5
+        while self._worker.is_alive() and time.monotonic() < deadline:
+            try:
+                while True:
+                    self._buffer.get_nowait()  # Unblock a worker waiting to put
+            except queue.Empty:
+                pass
+            self._worker.join(_POLL)
+        if self.mode == "process":
+            if self._worker.is_alive():
+                self._worker.terminate()
+            self._worker.join()
+            self._buffer.close()
+            self._buffer.join_thread()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        if not getattr(self, "_finished", True):
+            self._stop.set()
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "depth": self.depth,
+            "items": self._items,
+            "fetches": self._fetches,
+            "mean_occupancy": self._occupancy_total / self._fetches if self._fetches else 0.0,
+            "max_occupancy": self._occupancy_max,
+            "empty_waits": self._empty_waits,
+            "full_waits": self._full_waits.value,
+        }
+
+
+def prefetch(iterable, depth=8, mode="thread", chunk_size=1):
+    """Iterate over iterable while a background worker produces up to `depth` entries ahead."""
+    return Prefetcher(iterable, depth, mode, chunk_size)
+
+
+""" 2-Example
+A producer and a consumer that each take 2 ms per item: serially their times add, prefetched they overlap. """
+
+
+def slow_numbers(n, delay=0.002):
+    for i in range(n):
+        time.sleep(delay)  # e.g. reading from disk or the network
+        yield i
+
+
+def cpu_numbers(n, work=20_000):
+    for i in range(n):
+        sum(range(work))
+        yield i
+
+
+def failing(n):
+    yield from range(n)
+    raise ValueError(f"producer failed after {n} items")
+
+
+def _consume(items, delay=0.002):
+    total = 0
+    for item in items:
+        time.sleep(delay)
+        total += item
+    return total
+
+
+if __name__ == "__main__":
+    n = 300
+    start = time.perf_counter()
+    _consume(slow_numbers(n))
+    print(f"serial:           {time.perf_counter() - start:.2f}s")
+    with prefetch(slow_numbers(n), depth=16) as items:
+        start = time.perf_counter()
+        _consume(items)
+        print(f"prefetch thread:  {time.perf_counter() - start:.2f}s  {items.stats()}")
+    with prefetch(functools.partial(cpu_numbers, n), depth=16, mode="process", chunk_size=8) as items:
+        start = time.perf_counter()
+        _consume(items)
+        print(f"prefetch process: {time.perf_counter() - start:.2f}s  {items.stats()}")
+
+    items = prefetch(failing(3))
+    try:
+        for item in items:
+            print("got", item)
+    except ValueError as exc:
+        print("raised:", exc)
+
+    with prefetch(itertools.count(), depth=4) as items:  # Infinite producer, stopped early
+        print("first of an infinite stream:", [next(items) for _ in range(5)])
+    print("after close:", list(items))
@@ -0,0 +1,247 @@
+""" LATENCY PROFILING IN PYTHON """
+
+""" Definition
+Decorators.timing_decorator measures a call with time.time() and prints the result every time. That is fine for
+a lesson, but under load it floods stdout, and time.time() is too coarse to see sub-millisecond functions.
+
+This module records latencies instead of printing them:
+
+.Clock: time.perf_counter_ns() gives integer nanoseconds from a monotonic, high resolution clock.
+.HDR-style histogram: Values are bucketed log-linearly (a power-of-two exponent plus a few mantissa bits),
+ so every recorded value keeps about 3% relative precision from 1ns to hours in a few hundred buckets.
+.Per-thread recording: Each thread writes into its own histogram, so the hot path takes no lock.
+ Threads only meet when a snapshot merges their histograms.
+.Sampling: With sample_rate < 1.0 only every n-th call is timed; the other calls cost a counter increment.
+.Registry: Histograms are kept by name and exported as percentiles (p50/p95/p99/max) or JSON. """
+
+import functools
+import itertools
+import json
+import threading
+import time
+
+SUB_BUCKET_BITS = 5  # 2**5 sub-buckets per power of two, about 3% worst-case error
+_SUB_BUCKET_MASK = (1 << SUB_BUCKET_BITS) - 1
+
+
+def bucket_index(value):
+    """Map a non-negative integer to its log-linear bucket; indexes grow with the value."""
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    if shift <= 0:
+        return value
+    return (shift << SUB_BUCKET_BITS) | (value >> shift)
+
+
+def bucket_value(index):
+    """Middle of the value range covered by a bucket."""
+    shift = index >> SUB_BUCKET_BITS
+    if shift == 0:
+        return index
+    low = (index & _SUB_BUCKET_MASK) << shift
+    return low + (1 << (shift - 1))
+
+
+""" 1-The Histogram
+A sparse dict of bucket -> count. Only its owning thread writes to it. """
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value):
+        index = bucket_index(value)
+        counts = self.counts
+        counts[index] = counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def merge(self, other):
+        for index, n in dict(other.counts).items():
+            self.counts[index] = self.counts.get(index, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+
+    def percentile(self, pct):
+        if not self.count:
+            return 0
+        rank = max(1, -(-self.count * pct // 100))  # ceil without floats
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_value(index), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ns": self.total / self.count if self.count else 0.0,
+            "min_ns": self.min or 0,
+            "p50_ns": self.percentile(50),
+            "p95_ns": self.percentile(95),
+            "p99_ns": self.percentile(99),
+            "max_ns": self.max,
+        }
+
+
+""" 2-The Registry
+Holds one histogram per (name, thread). Creating a thread's histogram takes the lock once;
+recording never does. """
+
+
+class LatencyRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # name -> list of per-thread histograms
+        self._local = threading.local()
+
+    def histogram(self, name):
+        """The calling thread's histogram for name."""
+        per_thread = self._local.__dict__
+        hist = per_thread.get(name)
+        if hist is None:
+            hist = per_thread[name] = Histogram()
+            with self._lock:
+                self._histograms.setdefault(name, []).append(hist)
+        return hist
+
+    def record(self, name, value_ns):
+        self.histogram(name).record(value_ns)
+
+    def merged(self, name):
+        merged = Histogram()
+        with self._lock:
+            parts = list(self._histograms.get(name, ()))
+        for hist in parts:
+            merged.merge(hist)
+        return merged
+
+    def names(self):
+        with self._lock:
+            return sorted(self._histograms)
+
+    def snapshot(self):
+        return {name: self.merged(name).summary() for name in self.names()}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def dump(self, path):
+        with open(path, "w") as file:
+            file.write(self.to_json(indent=2))
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._local = threading.local()
+
+    def report(self):
+        print(f"{'name':<30}{'count':>10}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}{'max us':>10}")
+        for name, s in self.snapshot().items():
+            print(f"{name:<30}{s['count']:>10}{s['p50_ns'] / 1e3:>10.2f}{s['p95_ns'] / 1e3:>10.2f}"
+                  f"{s['p99_ns'] / 1e3:>10.2f}{s['max_ns'] / 1e3:>10.2f}")
+
+
+registry = LatencyRegistry()
+
+
+""" 3-The Decorator
+A drop-in replacement for timing_decorator. Sampling is deterministic (every n-th call), which is
+cheaper than drawing a random number on every call; next() on an itertools.count is atomic under the GIL. """
+
+
+def profile(name=None, sample_rate=1.0, registry=registry):
+    if callable(name):  # Used as a bare @profile
+        return profile()(name)
+    if not 0.0 < sample_rate <= 1.0:
+        raise ValueError("sample_rate must be in (0, 1]")
+    every = max(1, round(1 / sample_rate))
+    clock = time.perf_counter_ns
+
+    def decorator(func):
+        label = name or f"{func.__module__}.{func.__qualname__}"
+        ticket = itertools.count(1)
+
+        if every == 1:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = clock()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    registry.histogram(label).record(clock() - start)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if next(ticket) % every:
+                    return func(*args, **kwargs)
+                start = clock()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    registry.histogram(label).record(clock() - start)
+
+        wrapper.stats = lambda: registry.merged(label).summary()
+        return wrapper
+    return decorator
+
+
+""" 4-Overhead Check
+Compares the bare call, full profiling and 1% sampling on a function that does nothing. """
+
+
+def measure_overhead(calls=200_000):
+    def noop():
+        pass
+
+    local_registry = LatencyRegistry()
+    variants = [
+        ("bare", noop),
+        ("profile(100%)", profile("noop", registry=local_registry)(noop)),
+        ("profile(1%)", profile("noop_sampled", sample_rate=0.01, registry=local_registry)(noop)),
+    ]
+    results = {}
+    for label, func in variants:
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            func()
+        results[label] = (time.perf_counter_ns() - start) / calls
+    for label, per_call in results.items():
+        print(f"{label:<15}{per_call:>8.0f} ns/call  (+{per_call - results['bare']:.0f} ns)")
+    return results
+
+
+if __name__ == "__main__":
+    @profile
+    def slow_function():
+        time.sleep(0.002)
+
+    @profile(sample_rate=0.5)
+    def fast_function(n):
+        return sum(range(n))
+
+    threads = [threading.Thread(target=lambda: [fast_function(100) for _ in range(1000)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for _ in range(20):
+        slow_function()
+    for thread in threads:
+        thread.join()
+
+    registry.report()
+    print(registry.to_json(indent=2))
+    measure_overhead()
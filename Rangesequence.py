@@ -0,0 +1,152 @@
+""" A SIZED, RANDOM-ACCESS RANGE IN PYTHON """
+
+""" Definition
+Iterators.MyIterator(start, end) counts from start to end with __next__ only. To ask for its length, a slice,
+`x in it` or the numbers backwards, callers had to write list(MyIterator(...)), which stores every number.
+
+RangeSequence takes the same (start, end) and describes the numbers instead of storing them:
+
+.Sequence: len(), indexing, `in`, reversed(), index() and count() are O(1) arithmetic on (start, step, length),
+ and it is registered as a collections.abc.Sequence.
+.Slices are views: r[10:20] or r[::-1] is another RangeSequence over the same numbers, built in O(1).
+.Step: RangeSequence(0, 10, 2) is 0, 2, ..., 10. Like MyIterator, `end` is included when the step lands on it.
+.Iterable, not an iterator: `for x in r` works, and iter(r) returns a fresh iterator each time, so a
+ RangeSequence can be looped over any number of times. It has no __next__; call iter(r) first where
+ MyIterator's one-pass next() behaviour is wanted.
+
+Under the hood the arithmetic is delegated to a built-in range, so iteration runs at C speed. It still has to
+create every int as it goes, so a full loop is about 3x slower than looping over an already built list; the
+win is in never building the list (memory and time) and in the O(1) operations. """
+
+import collections.abc
+import sys
+import time
+
+
+class RangeSequence(collections.abc.Sequence):
+    __slots__ = ("_range",)
+
+    def __init__(self, start, end, step=1):
+        if step == 0:
+            raise ValueError("step must not be 0")
+        self._range = range(start, end + 1 if step > 0 else end - 1, step)
+
+    @classmethod
+    def _view(cls, numbers):
+        view = cls.__new__(cls)
+        view._range = numbers
+        return view
+
+    @property
+    def start(self):
+        return self._range.start
+
+    @property
+    def step(self):
+        return self._range.step
+
+    @property
+    def end(self):
+        """The last number, or None when empty."""
+        return self._range[-1] if self._range else None
+
+    def __len__(self):
+        return len(self._range)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._view(self._range[index])
+        return self._range[index]
+
+    def __contains__(self, value):
+        return value in self._range
+
+    def __reversed__(self):
+        return reversed(self._range)
+
+    def __iter__(self):
+        return iter(self._range)
+
+    def index(self, value, start=0, stop=None):
+        position = self._range.index(value)
+        start, stop, _ = slice(start, stop).indices(len(self._range))  # Negative bounds, as list.index
+        if not start <= position < stop:
+            raise ValueError(f"{value} is not in range")
+        return position
+
+    def count(self, value):
+        return self._range.count(value)
+
+    def __eq__(self, other):
+        if isinstance(other, RangeSequence):
+            return self._range == other._range
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._range)
+
+    def __repr__(self):
+        if not self._range:
+            return f"RangeSequence(empty, step={self.step})"
+        return f"RangeSequence({self.start}, {self.end}, {self.step})"
+
+
+""" Benchmarks
+RangeSequence vs materializing the same numbers with list(MyIterator(...)), as callers did before. """
+
+
+class _MyIterator:
+    """The original Iterators.MyIterator, kept here as the baseline."""
+
+    def __init__(self, start, end):
+        self.current = start
+        self.end = end
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.current > self.end:
+            raise StopIteration
+        self.current += 1
+        return self.current - 1
+
+
+def _timed(func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def benchmark(n=1_000_000):
+    numbers, build = _timed(lambda: list(_MyIterator(0, n - 1)))
+    seq, build_seq = _timed(lambda: RangeSequence(0, n - 1), 1000)
+    list_bytes = sys.getsizeof(numbers) + sum(sys.getsizeof(x) for x in numbers)
+    print(f"n={n}")
+    print(f"{'operation':<22}{'list':>14}{'RangeSequence':>16}")
+    print(f"{'memory (bytes)':<22}{list_bytes:>14,}{sys.getsizeof(seq) + sys.getsizeof(seq._range):>16,}")
+    print(f"{'build (s)':<22}{build:>14.6f}{build_seq:>16.6f}")
+    rows = [
+        ("len()", lambda: len(numbers), lambda: len(seq), 1000),
+        ("x in (last)", lambda: n - 1 in numbers, lambda: n - 1 in seq, 10),
+        ("[n // 2]", lambda: numbers[n // 2], lambda: seq[n // 2], 1000),
+        ("[::-1]", lambda: numbers[::-1], lambda: seq[::-1], 10),
+        ("sum(reversed())", lambda: sum(reversed(numbers)), lambda: sum(reversed(seq)), 3),
+        ("sum(for loop)", lambda: sum(numbers), lambda: sum(seq), 3),
+    ]
+    for label, on_list, on_seq, repeat in rows:
+        expected, list_time = _timed(on_list, repeat)
+        result, seq_time = _timed(on_seq, repeat)
+        assert list(result) == expected if isinstance(result, RangeSequence) else result == expected
+        print(f"{label + ' (s)':<22}{list_time:>14.6f}{seq_time:>16.6f}")
+
+
+if __name__ == "__main__":
+    r = RangeSequence(1, 5)
+    print(list(r), len(r), r[1:3], 5 in r, list(reversed(r)))
+    it = iter(r)
+    print(next(it), next(it), list(it), list(r))  # Every iter(r) starts over
+    evens = RangeSequence(0, 10, 2)
+    print(evens, list(evens), evens[::-1], evens.index(6), list(RangeSequence(5, 1, -2)))
+    benchmark()
@@ -0,0 +1,353 @@
+""" RATE LIMITING IN PYTHON """
+
+""" Definition
+threading_1.py shows a Lock and a Semaphore(2), which limit how many threads touch a resource at the same
+time, but nothing limits how OFTEN a function may be called. This module adds three limiters and a decorator
+for each. All of them work on plain functions and on coroutine functions:
+
+.Token bucket: Tokens refill at `rate` per second up to `capacity`; each call spends one. Allows short bursts.
+.Sliding window: At most `limit` calls in any `window` seconds, tracked with a deque of call times.
+.Max in flight: At most `n` calls running at once (a Semaphore that also works for asyncio).
+
+Modes:
+.Blocking (block=True): The call waits until it is allowed, optionally up to `timeout` seconds.
+.Fail fast (block=False): The call raises RateLimitExceeded immediately.
+
+Blocking callers RESERVE their slot under the lock and then sleep outside it. Nobody retries in a loop, so
+the achieved rate stays within a fraction of a percent of the target even with many threads competing.
+Every limiter counts allowed calls, throttled calls (delayed or rejected) and total time spent waiting. """
+
+import asyncio
+import collections
+import functools
+import threading
+import time
+
+
+class RateLimitExceeded(RuntimeError):
+    pass
+
+
+""" 1-Time-Based Limiters
+reserve() returns how long the caller must sleep before its call is allowed, or raises. """
+
+
+class _TimeLimiter:
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.allowed = self.throttled = self.rejected = 0
+        self.waited = 0.0
+
+    def _reserve_locked(self, now, timeout):
+        raise NotImplementedError
+
+    def reserve(self, block=True, timeout=None):
+        with self._lock:
+            wait = self._reserve_locked(self._clock(), timeout if block else 0.0)
+            if wait is None:
+                self.throttled += 1
+                self.rejected += 1
+                raise RateLimitExceeded(f"{type(self).__name__}: call not allowed now")
+            self.allowed += 1
+            if wait > 0:
+                self.throttled += 1
+                self.waited += wait
+            return wait
+
+    def stats(self):
+        with self._lock:
+            return {"allowed": self.allowed, "throttled": self.throttled,
+                    "rejected": self.rejected, "waited_s": self.waited}
+
+
+class TokenBucket(_TimeLimiter):
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        super().__init__(clock)
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate / 100))
+        self._tokens = self.capacity
+        self._stamp = clock()
+
+    def _reserve_locked(self, now, timeout):
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        wait = (1 - self._tokens) / self.rate
+        if timeout is not None and wait > timeout:
+            return None
+        self._tokens -= 1  # Go into debt: later callers queue up behind this one
+        return wait
+
+
+class SlidingWindow(_TimeLimiter):
+    def __init__(self, limit, window=1.0, clock=time.monotonic):
+        if limit < 1 or window <= 0:
+            raise ValueError("limit must be >= 1 and window > 0")
+        super().__init__(clock)
+        self.limit = limit
+        self.window = float(window)
+        self._calls = collections.deque()  # Start times of admitted calls, some possibly in the future
+
+    def _reserve_locked(self, now, timeout):
+        calls = self._calls
+        horizon = now - self.window
+        while calls and calls[0] <= horizon:
+            calls.popleft()
+        if len(calls) < self.limit:
+            calls.append(now)
+            return 0.0
+        start = calls[-self.limit] + self.window  # When the limit-th newest call leaves the window
+        wait = start - now
+        if timeout is not None and wait > timeout:
+            return None
+        calls.append(start)
+        return wait
+
+
+""" 2-Concurrency Limiter
+Permits are handed directly from a finishing call to the oldest waiter, thread or coroutine alike, so a
+newcomer cannot steal a permit from somebody who has been waiting. """
+
+
+class _Waiter:
+    __slots__ = ("event", "loop", "future", "granted")
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+        self.granted = False
+
+    def grant(self):
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(True)
+
+
+class MaxInFlight:
+    def __init__(self, n):
+        if n < 1:
+            raise ValueError("n must be >= 1")
+        self.n = n
+        self._active = 0
+        self._waiters = collections.deque()
+        self._lock = threading.Lock()
+        self.allowed = self.throttled = self.rejected = self.peak = 0
+        self.waited = 0.0
+
+    def _try_acquire_locked(self):
+        if self._active < self.n and not self._waiters:
+            self._active += 1
+            self.allowed += 1
+            self.peak = max(self.peak, self._active)
+            return True
+        return False
+
+    def _reject_locked(self):
+        self.throttled += 1
+        self.rejected += 1
+        raise RateLimitExceeded(f"MaxInFlight: {self.n} calls already running")
+
+    def _give_up(self, waiter, waited):
+        """Called on timeout/cancel; returns True if the permit arrived anyway."""
+        with self._lock:
+            self.waited += waited
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            self.rejected += 1
+            return False
+
+    def acquire(self, block=True, timeout=None):
+        with self._lock:
+            if self._try_acquire_locked():
+                return
+            if not block:
+                self._reject_locked()
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+            self.throttled += 1
+        start = time.monotonic()
+        if waiter.event.wait(timeout):
+            with self._lock:
+                self.waited += time.monotonic() - start
+            return
+        if self._give_up(waiter, time.monotonic() - start):  # Records the wait itself
+            return
+        raise RateLimitExceeded(f"MaxInFlight: no permit within {timeout}s")
+
+    async def acquire_async(self, block=True, timeout=None):
+        with self._lock:
+            if self._try_acquire_locked():
+                return
+            if not block:
+                self._reject_locked()
+            waiter = _Waiter(asyncio.get_running_loop())
+            self._waiters.append(waiter)
+            self.throttled += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if not self._give_up(waiter, time.monotonic() - start):
+                if isinstance(exc, asyncio.CancelledError):
+                    raise
+                raise RateLimitExceeded(f"MaxInFlight: no permit within {timeout}s") from None
+            if isinstance(exc, asyncio.CancelledError):
+                self.release()  # Got the permit but the caller is gone
+                raise
+            return
+        with self._lock:
+            self.waited += time.monotonic() - start
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.grant()  # The permit moves to the waiter, _active is unchanged
+                self.allowed += 1
+                return
+            self._active -= 1
+
+    def stats(self):
+        with self._lock:
+            return {"allowed": self.allowed, "throttled": self.throttled, "rejected": self.rejected,
+                    "waited_s": self.waited, "active": self._active, "waiting": len(self._waiters),
+                    "peak": self.peak}
+
+
+""" 3-Decorators """
+
+
+def rate_limited(limiter, block=True, timeout=None):
+    """Apply a TokenBucket or SlidingWindow to a function or coroutine function."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                wait = limiter.reserve(block, timeout)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                wait = limiter.reserve(block, timeout)
+                if wait > 0:
+                    time.sleep(wait)
+                return func(*args, **kwargs)
+        wrapper.limiter = limiter
+        return wrapper
+    return decorator
+
+
+def token_bucket(rate, capacity=None, block=True, timeout=None):
+    return rate_limited(TokenBucket(rate, capacity), block, timeout)
+
+
+def sliding_window(limit, window=1.0, block=True, timeout=None):
+    return rate_limited(SlidingWindow(limit, window), block, timeout)
+
+
+def max_in_flight(n, block=True, timeout=None):
+    limiter = n if isinstance(n, MaxInFlight) else MaxInFlight(n)
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                await limiter.acquire_async(block, timeout)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    limiter.release()
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                limiter.acquire(block, timeout)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    limiter.release()
+        wrapper.limiter = limiter
+        return wrapper
+    return decorator
+
+
+""" 4-Accuracy Check
+Several threads hammer a limited no-op for `duration` seconds; the achieved rate is compared with the target.
+A target of 100k calls/sec needs enough CPU to actually make 100k Python calls per second. """
+
+
+def accuracy(limiter_factory, target_rate, duration=1.0, threads=4, warmup=0.2):
+    """Achieved rate after `warmup` seconds, so the initial burst allowance does not count."""
+    limiter = limiter_factory()
+    call = rate_limited(limiter)(lambda: None)
+    counts = [0] * threads
+    begin = time.monotonic()
+    measure_from = begin + warmup
+    stop_at = measure_from + duration
+
+    def worker(i):
+        n = 0
+        now = time.monotonic()
+        while now < stop_at:
+            call()
+            now = time.monotonic()
+            if now >= measure_from:
+                n += 1
+        counts[i] = n
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    achieved = sum(counts) / (time.monotonic() - measure_from)
+    return achieved, (achieved - target_rate) / target_rate * 100, limiter.stats()
+
+
+if __name__ == "__main__":
+    @token_bucket(rate=5, capacity=1)
+    def ping(i):
+        return i
+
+    start = time.monotonic()
+    print([ping(i) for i in range(6)], f"{time.monotonic() - start:.2f}s")
+
+    @sliding_window(limit=2, window=1.0, block=False)
+    def fail_fast():
+        return "ok"
+
+    for _ in range(3):
+        try:
+            print(fail_fast())
+        except RateLimitExceeded as exc:
+            print("rejected:", exc)
+
+    @max_in_flight(2)
+    async def fetch(i):
+        await asyncio.sleep(0.05)
+        return i
+
+    async def main():
+        return await asyncio.gather(*(fetch(i) for i in range(6)))
+
+    print(asyncio.run(main()), fetch.limiter.stats())
+
+    for name, factory, rate in [("token bucket", lambda: TokenBucket(100_000, capacity=1000), 100_000),
+                                ("sliding window", lambda: SlidingWindow(10_000, window=0.1), 100_000)]:
+        achieved, error, stats = accuracy(factory, rate, duration=1.0)
+        print(f"{name:<15} target {rate}/s achieved {achieved:,.0f}/s ({error:+.2f}%) {stats}")
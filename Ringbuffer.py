@@ -0,0 +1,287 @@
+""" RING BUFFERS AND ZERO-COPY CYCLING IN PYTHON """
+
+""" Definition
+Iterators.py cycles with itertools.cycle. While cycle goes through its input the first time it saves every
+element in an internal list, because it does not know the input can be read again. Cycling a list of 10 million
+items therefore holds 10 million extra references.
+
+When the input is already a sequence (list, array, memoryview, RangeSequence, ...) nothing needs saving:
+
+.cycle(buffer, start) iterates the buffer again and again in C, without copying it.
+.BufferCycle(buffer) does the same with a cursor you control: O(1) rotate(n) and a position you can read.
+.RingBuffer(capacity, typecode) is a fixed-size circular buffer on storage allocated once (an array.array for
+ numbers, a list otherwise); it never grows or reallocates:
+   .append() overwrites the oldest item when full (sliding-window processing); last(n) and window() return
+    views of the newest items that read straight from the storage.
+   .push() / pop() never overwrite and are safe for one producer thread and one consumer thread without a lock:
+    the producer only writes the slot and then `_write`, the consumer only reads the slot and then writes
+    `_read`. Each is a single attribute store, which CPython performs atomically. Anything else (append,
+    rotate, more than one producer or consumer) needs a lock.
+   .rotate(n) is O(1) on a full ring: only the start index moves.
+
+Views are live: they show the storage as it is when they are read, so an append after creating a view can
+change what it contains. Take list(view) to keep a snapshot.
+
+Cost: cycle() is as fast as itertools.cycle. BufferCycle and RingBuffer.append run Python code for every item,
+so they are several times slower per item than itertools.cycle and deque(maxlen); use them for the O(1)
+rotation, the fixed typed storage, the views and the lock-free SPSC handoff, not for raw speed. """
+
+import array
+import collections
+import itertools
+import sys
+import threading
+import time
+import tracemalloc
+
+
+""" 1-Cycling Without Copies """
+
+
+def cycle(buffer, start=0):
+    """buffer[start], buffer[start+1], ... wrapping around forever; buffer is iterated, never copied."""
+    if not len(buffer):
+        return iter(())
+    head = itertools.islice(buffer, start % len(buffer), None)
+    return itertools.chain(head, itertools.chain.from_iterable(itertools.repeat(buffer)))
+
+
+class BufferCycle:
+    __slots__ = ("buffer", "position")
+
+    def __init__(self, buffer, start=0):
+        if not len(buffer):
+            raise ValueError("cannot cycle an empty buffer")
+        self.buffer = buffer
+        self.position = start % len(buffer)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = self.buffer[self.position]
+        self.position += 1
+        if self.position == len(self.buffer):
+            self.position = 0
+        return item
+
+    def rotate(self, n=1):
+        """Skip n items ahead (or back, for negative n) in O(1)."""
+        self.position = (self.position + n) % len(self.buffer)
+
+    def peek(self):
+        return self.buffer[self.position]
+
+
+""" 2-The Ring Buffer
+_read and _write are ever-increasing counters; the slot for counter c is c % capacity. _write - _read is the
+number of items, so full and empty are never confused. """
+
+
+class RingView:
+    """Read-only view of `length` consecutive items of a ring, starting `offset` items after its oldest."""
+    __slots__ = ("_ring", "_offset", "_length")
+
+    def __init__(self, ring, offset, length):
+        self._ring = ring
+        self._offset = offset
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("view index out of range")
+        ring = self._ring
+        return ring._storage[(ring._read + self._offset + index) % ring.capacity]
+
+    def __iter__(self):
+        ring = self._ring
+        start = (ring._read + self._offset) % ring.capacity
+        end = start + self._length
+        if end <= ring.capacity:
+            return iter(ring._storage[start:end])  # memoryview slice for arrays: no copy
+        return itertools.chain(ring._storage[start:], ring._storage[:end - ring.capacity])
+
+    def __repr__(self):
+        return f"RingView({list(self)})"
+
+
+class RingBuffer:
+    def __init__(self, capacity, typecode=None):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self.typecode = typecode
+        if typecode is None:
+            self._storage = [None] * capacity
+        else:
+            self._storage = memoryview(array.array(typecode, bytes(capacity * array.array(typecode).itemsize)))
+        self._read = 0
+        self._write = 0
+
+    @classmethod
+    def from_iterable(cls, iterable, capacity, typecode=None):
+        ring = cls(capacity, typecode)
+        ring.extend(iterable)
+        return ring
+
+    def __len__(self):
+        return self._write - self._read
+
+    def full(self):
+        return self._write - self._read == self.capacity
+
+    def empty(self):
+        return self._write == self._read
+
+    # Sliding window (single thread)
+
+    def append(self, item):
+        """Add item, dropping the oldest one when the ring is full."""
+        self._storage[self._write % self.capacity] = item
+        self._write += 1
+        if self._write - self._read > self.capacity:
+            self._read += 1
+
+    def extend(self, iterable):
+        for item in iterable:
+            self.append(item)
+
+    def last(self, n):
+        """View of the newest n items (fewer if the ring holds fewer), oldest first."""
+        size = len(self)
+        n = min(n, size)
+        return RingView(self, size - n, n)
+
+    def window(self):
+        return RingView(self, 0, len(self))
+
+    def __getitem__(self, index):
+        return self.window()[index]
+
+    def __iter__(self):
+        return iter(self.window())
+
+    def rotate(self, n=1):
+        """Rotate right by n like deque.rotate: the last n items move to the front. O(1); needs a full ring."""
+        if not self.full():
+            raise ValueError("rotate needs a full ring; a partly filled one would have to move items")
+        self._read -= n
+        self._write -= n
+
+    # Single producer / single consumer
+
+    def push(self, item):
+        """Producer side: add item and return True, or return False if the ring is full."""
+        write = self._write
+        if write - self._read == self.capacity:
+            return False
+        self._storage[write % self.capacity] = item
+        self._write = write + 1  # Publish only after the slot is written
+        return True
+
+    def pop(self):
+        """Consumer side: remove and return the oldest item; IndexError if the ring is empty."""
+        read = self._read
+        if read == self._write:
+            raise IndexError("pop from an empty ring")
+        item = self._storage[read % self.capacity]
+        self._read = read + 1  # Free the slot only after it is read
+        return item
+
+    def __repr__(self):
+        return f"RingBuffer({list(self)}, capacity={self.capacity})"
+
+
+""" 3-Benchmarks """
+
+
+def _measured(func):
+    """(seconds, peak traced bytes); timed without tracemalloc, which slows Python code down."""
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def benchmark(n=2_000_000, window=100, steps=1_000_000):
+    data = list(range(n))
+    turns = n + n // 2  # Once around and half of the second time
+    print(f"cycling {n} items for {turns} steps")
+    for label, factory in (("itertools.cycle", lambda: itertools.cycle(data)),
+                           ("Ringbuffer.cycle", lambda: cycle(data)),
+                           ("BufferCycle", lambda: BufferCycle(data))):
+        elapsed, peak = _measured(lambda: collections.deque(itertools.islice(factory(), turns), maxlen=0))
+        print(f"  {label:<18}{elapsed:>8.3f}s  peak extra memory {peak / 1e6:>7.1f} MB")
+
+    print(f"sliding window of {window} over {steps} numbers, summing the window every 1000 steps")
+
+    def with_deque():
+        last = collections.deque(maxlen=window)
+        for i in range(steps):
+            last.append(i)
+            if i % 1000 == 0:
+                sum(last)
+
+    def with_ring():
+        ring = RingBuffer(window, "q")
+        append = ring.append
+        for i in range(steps):
+            append(i)
+            if i % 1000 == 0:
+                sum(ring.last(window))
+
+    for label, func in (("deque(maxlen)", with_deque), ("RingBuffer('q')", with_ring)):
+        elapsed, peak = _measured(func)
+        print(f"  {label:<18}{elapsed:>8.3f}s  peak memory {peak / 1e3:>7.1f} KB")
+    ring = RingBuffer(window, "q")
+    print(f"  storage: {sys.getsizeof(ring._storage.obj)} bytes for {window} int64 slots, allocated once")
+
+
+def _spsc_demo(items=200_000, capacity=1024):
+    ring = RingBuffer(capacity, "q")
+    received = []
+
+    def producer():
+        for i in range(items):
+            while not ring.push(i):
+                time.sleep(0)  # Full: let the consumer run
+
+    def consumer():
+        while len(received) < items:
+            try:
+                received.append(ring.pop())
+            except IndexError:
+                time.sleep(0)
+
+    threads = [threading.Thread(target=producer), threading.Thread(target=consumer)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"SPSC: {len(received)} items passed in order: {received == list(range(items))}")
+
+
+if __name__ == "__main__":
+    colors = BufferCycle(["A", "B", "C"])
+    print([next(colors) for _ in range(4)], end=" ")
+    colors.rotate(-1)
+    print([next(colors) for _ in range(3)], list(itertools.islice(cycle("abc", start=2), 5)))
+
+    ring = RingBuffer(4, "i")
+    ring.extend(range(1, 7))
+    print(ring, list(ring.last(2)), ring[0])
+    ring.rotate(1)
+    print("rotated:", ring)
+    _spsc_demo()
+    benchmark()
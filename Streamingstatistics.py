@@ -0,0 +1,257 @@
+""" STREAMING STATISTICS WITH COROUTINES IN PYTHON """
+
+""" Definition
+Generators.py mentions send(value) and close() without using them. A generator that receives values through
+send() is a coroutine: it sits at `yield`, gets the next value, updates its state and yields a result.
+
+This module is a small library of such coroutines. Each one summarizes an unbounded stream in constant memory:
+
+.running_stats()        Count, mean, variance, min and max (Welford's algorithm, numerically stable).
+.quantile(p)            Streaming estimate of the p-quantile with the P-square algorithm (5 markers).
+.top_k(k)               The k largest values seen (a min-heap of size k).
+.heavy_hitters(k)       The k most frequent values, approximately (Space-Saving, k counters).
+.distinct(precision)    Approximate number of distinct values (HyperLogLog, 2**precision one-byte registers).
+.broadcast(...)         Fan-out: sends every value to several coroutines, which may be broadcasts themselves,
+                        so a single pass over the stream feeds a whole tree of aggregates.
+
+Protocol: target.send(value) updates the aggregate and returns None, which keeps the per-value cost low.
+target.send(None) returns the current result. target.close() stops it (broadcast closes its children too).
+Every coroutine is already primed by the @coroutine decorator, so there is no need to call next() first. """
+
+import functools
+import heapq
+import math
+import random
+import time
+
+
+def coroutine(func):
+    """Advance a new generator to its first yield so it is ready for send()."""
+    @functools.wraps(func)
+    def start(*args, **kwargs):
+        gen = func(*args, **kwargs)
+        next(gen)
+        return gen
+    return start
+
+
+""" 1-Mean and Variance (Welford) """
+
+
+@coroutine
+def running_stats():
+    n = 0
+    mean = m2 = 0.0
+    low = high = None
+    value = yield
+    while True:
+        if value is None:
+            variance = m2 / (n - 1) if n > 1 else 0.0
+            value = yield {"count": n, "mean": mean, "variance": variance, "stdev": math.sqrt(variance),
+                           "min": low, "max": high}
+            continue
+        n += 1
+        delta = value - mean
+        mean += delta / n
+        m2 += delta * (value - mean)
+        if low is None or value < low:
+            low = value
+        if high is None or value > high:
+            high = value
+        value = yield
+
+
+""" 2-Quantiles (P-square)
+Five markers track the minimum, p/2, p, (1+p)/2 and the maximum. Their heights are adjusted with a parabolic
+(or, if that would break ordering, linear) formula as the desired marker positions drift. """
+
+
+@coroutine
+def quantile(p):
+    if not 0.0 < p < 1.0:
+        raise ValueError("p must be between 0 and 1")
+    first = []
+    value = yield
+    while len(first) < 5:
+        if value is None:
+            value = yield _exact_quantile(first, p)
+            continue
+        first.append(value)
+        if len(first) < 5:
+            value = yield
+    q = sorted(first)
+    n = [0, 1, 2, 3, 4]
+    desired = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+    increment = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+    while True:
+        value = yield
+        while value is None:
+            value = yield q[2]
+        if value < q[0]:
+            q[0] = value
+            k = 0
+        elif value >= q[4]:
+            q[4] = value
+            k = 3
+        else:
+            k = 0
+            while value >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            desired[i] += increment[i]
+        for i in (1, 2, 3):
+            d = desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = candidate
+                n[i] += d
+
+
+def _exact_quantile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+""" 3-Top-k and Heavy Hitters """
+
+
+@coroutine
+def top_k(k):
+    heap = []
+    while True:
+        value = yield
+        while value is None:
+            value = yield sorted(heap, reverse=True)
+        if len(heap) < k:
+            heapq.heappush(heap, value)
+        elif value > heap[0]:
+            heapq.heapreplace(heap, value)
+
+
+@coroutine
+def heavy_hitters(k):
+    """Space-Saving. The result is (value, count, max_error) triples, most frequent first; count may
+    overestimate the true frequency by up to max_error. Keeping k counters costs O(k) per new value."""
+    counts = {}
+    errors = {}
+    while True:
+        value = yield
+        while value is None:
+            ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+            value = yield [(item, count, errors[item]) for item, count in ranked]
+        if value in counts:
+            counts[value] += 1
+        elif len(counts) < k:
+            counts[value] = 1
+            errors[value] = 0
+        else:
+            victim = min(counts, key=counts.get)
+            floor = counts.pop(victim)
+            del errors[victim]
+            counts[value] = floor + 1
+            errors[value] = floor
+
+
+""" 4-Distinct Count (HyperLogLog)
+Each value is hashed to 64 bits. The first `precision` bits pick a register, which keeps the longest run of
+leading zeros seen in the rest. The harmonic mean of 2**register over all registers estimates the
+cardinality with a standard error of about 1.04 / sqrt(2**precision). """
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x):
+    """splitmix64 finalizer: spreads Python's hash() (which is the identity for small ints) over 64 bits."""
+    z = (x + 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+@coroutine
+def distinct(precision=12):
+    if not 4 <= precision <= 18:
+        raise ValueError("precision must be between 4 and 18")
+    m = 1 << precision
+    registers = bytearray(m)
+    rest_bits = 64 - precision
+    rest_mask = (1 << rest_bits) - 1
+    alpha = 0.7213 / (1 + 1.079 / m)
+    while True:
+        value = yield
+        while value is None:
+            raw = alpha * m * m / sum(2.0 ** -r for r in registers)
+            zeros = registers.count(0)
+            if raw <= 2.5 * m and zeros:
+                raw = m * math.log(m / zeros)  # Small-range correction (linear counting)
+            value = yield round(raw)
+        h = _mix64(hash(value) & _MASK64)
+        index = h >> rest_bits
+        rank = rest_bits - (h & rest_mask).bit_length() + 1
+        if rank > registers[index]:
+            registers[index] = rank
+
+
+""" 5-Fan-out """
+
+
+@coroutine
+def broadcast(*targets, **named_targets):
+    """Send each value to every target; the result is a list (positional) or dict (named) of their results."""
+    try:
+        while True:
+            value = yield
+            while value is None:
+                value = yield (
+                    {name: target.send(None) for name, target in named_targets.items()} if named_targets
+                    else [target.send(None) for target in targets]
+                )
+            for target in targets:
+                target.send(value)
+            for target in named_targets.values():
+                target.send(value)
+    finally:
+        for target in (*targets, *named_targets.values()):
+            target.close()
+
+
+def feed(iterable, target):
+    """Push every item of iterable into target and return the final result."""
+    send = target.send
+    for item in iterable:
+        send(item)
+    return send(None)
+
+
+if __name__ == "__main__":
+    random.seed(7)
+    data = [random.gauss(100, 15) for _ in range(200_000)]
+    words = [f"user{int(random.paretovariate(1.2))}" for _ in range(200_000)]
+
+    numbers = broadcast(stats=running_stats(), p50=quantile(0.5), p99=quantile(0.99), top=top_k(3))
+    labels = broadcast(distinct=distinct(12), frequent=heavy_hitters(50))
+    tree = broadcast(numbers=numbers, labels=labels)
+
+    start = time.perf_counter()
+    for x, word in zip(data, words):
+        numbers.send(x)
+        labels.send(word)
+    result = tree.send(None)
+    print(f"one pass over {len(data)} items in {time.perf_counter() - start:.2f}s")
+    print(result["numbers"]["stats"])
+    ordered = sorted(data)
+    print("p50", result["numbers"]["p50"], "exact", ordered[len(data) // 2])
+    print("p99", result["numbers"]["p99"], "exact", ordered[int(len(data) * 0.99)])
+    print("top", result["numbers"]["top"])
+    print("distinct", result["labels"]["distinct"], "exact", len(set(words)))
+    print("frequent (value, count, max error)", result["labels"]["frequent"][:5])
+    tree.close()
@@ -0,0 +1,266 @@
+""" A BATCHED WORK QUEUE FOR THREADS IN PYTHON """
+
+""" Definition
+threading_1.py's consumer used to loop `while not q.empty()`: it stopped the first time the queue happened to be
+empty, even if the producer was about to put more, and it paid one lock round trip per item.
+
+WorkQueue is a thread-safe FIFO for many producers and many consumers:
+
+.Shutdown: close() acts as a sentinel for every consumer at once. Items already queued are still delivered;
+ after that get() raises QueueClosed, get_batch() returns [] and `for item in q` ends. With producers=N the
+ queue closes itself when all N producers have called producer_done(), so no producer has to know when the
+ others finish.
+.Backpressure: With maxsize > 0, put() and put_batch() wait while the queue is full. A put_batch() cut short
+ by its timeout or by close() reports how many items it managed to queue (exc.enqueued).
+.Batches: put_batch(items) and get_batch(max_items) move many items per lock acquisition. Waiting threads are
+ only notified when someone is actually waiting, and get_batch wakes as many producers as it freed slots for.
+
+Compared to queue.Queue there is no task_done()/join(); close() plus joining the consumer threads covers that. """
+
+import collections
+import queue
+import threading
+import time
+
+
+class QueueClosed(Exception):
+    """Raised by put() on a closed queue, and by get() on a closed queue that has been drained."""
+
+
+class WorkQueue:
+    def __init__(self, maxsize=0, producers=None):
+        self.maxsize = maxsize
+        self._items = collections.deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._getters = 0  # Threads waiting in get/get_batch
+        self._putters = 0  # Threads waiting in put/put_batch
+        self._producers = producers
+        self._closed = False
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        """No more puts; consumers drain what is left and then stop."""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def producer_done(self):
+        with self._lock:
+            if self._producers is None:
+                raise ValueError("the queue was created without producers=N")
+            self._producers -= 1
+            if self._producers > 0:
+                return
+        self.close()
+
+    def _wait(self, condition, ready, timeout, waiting_attr, error):
+        """Wait on condition until ready() (called with the lock held), counting ourselves as a waiter."""
+        if ready():
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        setattr(self, waiting_attr, getattr(self, waiting_attr) + 1)
+        try:
+            while not ready():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise error
+                condition.wait(remaining)
+        finally:
+            setattr(self, waiting_attr, getattr(self, waiting_attr) - 1)
+
+    def _space(self):
+        return self._closed or not self.maxsize or len(self._items) < self.maxsize
+
+    def _available(self):
+        return self._closed or self._items
+
+    # Producers
+
+    def put(self, item, timeout=None):
+        with self._lock:
+            self._wait(self._not_full, self._space, timeout, "_putters", queue.Full)
+            if self._closed:
+                raise QueueClosed("put on a closed queue")
+            self._items.append(item)
+            if self._getters:
+                self._not_empty.notify()
+
+    def put_batch(self, items, timeout=None):
+        """Put all items, in order; waits for space as needed, taking the lock once per wait. timeout covers the
+        whole batch. Returns the number of items put; if queue.Full or QueueClosed interrupts the batch, the
+        exception's `enqueued` attribute says how many of the first items did go in."""
+        items = list(items)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        start = 0
+        while start < len(items):
+            with self._lock:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    self._wait(self._not_full, self._space, remaining, "_putters", queue.Full)
+                    if self._closed:
+                        raise QueueClosed("put on a closed queue")
+                except (queue.Full, QueueClosed) as exc:
+                    exc.enqueued = start
+                    raise
+                end = len(items) if not self.maxsize else start + self.maxsize - len(self._items)
+                self._items.extend(items[start:end])
+                if self._getters:
+                    self._not_empty.notify(min(self._getters, end - start))
+                start = end
+        return len(items)
+
+    # Consumers
+
+    def get(self, timeout=None):
+        with self._lock:
+            self._wait(self._not_empty, self._available, timeout, "_getters", queue.Empty)
+            if not self._items:
+                raise QueueClosed("the queue is closed and drained")
+            item = self._items.popleft()
+            if self._putters:
+                self._not_full.notify()
+            return item
+
+    def get_batch(self, max_items=64, timeout=None):
+        """Wait for at least one item, then take up to max_items. [] means closed and drained."""
+        with self._lock:
+            self._wait(self._not_empty, self._available, timeout, "_getters", queue.Empty)
+            items = self._items
+            if len(items) <= max_items:
+                batch = list(items)
+                items.clear()
+            else:
+                popleft = items.popleft
+                batch = [popleft() for _ in range(max_items)]
+            if self._putters and batch:
+                self._not_full.notify(len(batch))
+            return batch
+
+    def __iter__(self):
+        """Yield items until the queue is closed and drained, fetching them in batches."""
+        while True:
+            batch = self.get_batch()
+            if not batch:
+                return
+            yield from batch
+
+
+""" Benchmark
+N producer and N consumer threads move the same number of items through a bounded queue:
+queue.Queue with one sentinel per consumer, WorkQueue item by item, and WorkQueue in batches. """
+
+
+def _run(producers, consumers, produce, consume):
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(producers)]
+    threads += [threading.Thread(target=consume) for _ in range(consumers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def _with_queue(n, items, maxsize):
+    q = queue.Queue(maxsize)
+    per_producer = items // n
+    remaining = [n]
+    count_lock = threading.Lock()
+    totals = []
+
+    def produce(_):
+        for i in range(per_producer):
+            q.put(i)
+        with count_lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            for _ in range(n):
+                q.put(None)  # One sentinel per consumer
+
+    def consume():
+        count = 0
+        while q.get() is not None:
+            count += 1
+        totals.append(count)
+
+    elapsed = _run(n, n, produce, consume)
+    return elapsed, sum(totals)
+
+
+def _with_work_queue(n, items, maxsize, batch):
+    q = WorkQueue(maxsize, producers=n)
+    per_producer = items // n
+    totals = []
+
+    def produce(_):
+        if batch == 1:
+            for i in range(per_producer):
+                q.put(i)
+        else:
+            for start in range(0, per_producer, batch):
+                q.put_batch(range(start, min(start + batch, per_producer)))
+        q.producer_done()
+
+    def consume():
+        count = 0
+        if batch == 1:
+            try:
+                while True:
+                    q.get()
+                    count += 1
+            except QueueClosed:
+                pass
+        else:
+            while chunk := q.get_batch(batch):
+                count += len(chunk)
+        totals.append(count)
+
+    elapsed = _run(n, n, produce, consume)
+    return elapsed, sum(totals)
+
+
+def benchmark(items=256_000, maxsize=1024, batch=64, threads=(1, 2, 4, 8, 16, 32)):
+    print(f"{items} items, maxsize={maxsize}, N producers + N consumers; items per second")
+    print(f"{'N':>4}{'queue.Queue':>14}{'WorkQueue':>14}{f'batch={batch}':>14}")
+    for n in threads:
+        row = []
+        for run in (lambda: _with_queue(n, items, maxsize),
+                    lambda: _with_work_queue(n, items, maxsize, 1),
+                    lambda: _with_work_queue(n, items, maxsize, batch)):
+            elapsed, received = run()
+            assert received == items // n * n, received
+            row.append(received / elapsed)
+        print(f"{n:>4}{row[0]:>14,.0f}{row[1]:>14,.0f}{row[2]:>14,.0f}")
+
+
+if __name__ == "__main__":
+    q = WorkQueue(maxsize=4, producers=2)
+    results = []
+
+    def producer(name):
+        for i in range(5):
+            q.put(f"{name}{i}")
+        q.producer_done()
+
+    def consumer():
+        for item in q:  # Ends when both producers are done and the queue is drained
+            results.append(item)
+
+    workers = [threading.Thread(target=producer, args=(name,)) for name in "ab"]
+    workers += [threading.Thread(target=consumer) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    print(sorted(results), q.closed)
+    benchmark()
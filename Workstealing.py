@@ -0,0 +1,270 @@
+""" A WORK-STEALING THREAD POOL IN PYTHON """
+
+""" Definition
+ThreadPoolExecutor (threading_1.py) keeps one shared queue.Queue: every submit and every worker pick-up goes
+through the same lock and condition, which becomes the bottleneck when tasks are tiny and plentiful.
+
+WorkStealingExecutor is a concurrent.futures.Executor where every worker owns a deque:
+
+.Local queues: A task goes into one worker's deque. The owner takes from the left end; deque operations are
+ atomic in CPython, so this path takes no lock at all.
+.Stealing: A worker whose deque is empty takes tasks from the right end of the other workers' deques before it
+ goes to sleep. Sleeping workers park on one condition, which submitters touch only if someone is parked.
+.Placement: submit() from outside the pool spreads tasks round-robin; submit() from inside a task puts the new
+ task on the current worker's deque. submit_to(key, ...) is an affinity hint: tasks with the same key go to the
+ same worker (hash(key) % workers), for example to keep one user's tasks on one warm cache. Stealing can still
+ move them when that worker is busy.
+.Batches: submit_many(fn, iterable) and map() split the work into one contiguous block per worker and wake the
+ pool once.
+.Metrics: stats() reports per worker the tasks run, tasks stolen, time spent queued (submit to start) and
+ running, as Profiling.Histogram percentiles. instrument=False skips the timing for the lowest overhead. """
+
+import collections
+import concurrent.futures
+import itertools
+import os
+import threading
+import time
+
+from Profiling import Histogram
+
+_clock = time.perf_counter_ns
+
+
+class _Worker:
+    __slots__ = ("index", "tasks", "thread", "executed", "stolen", "waits", "runs")
+
+    def __init__(self, index):
+        self.index = index
+        self.tasks = collections.deque()
+        self.thread = None
+        self.executed = 0
+        self.stolen = 0
+        self.waits = Histogram()
+        self.runs = Histogram()
+
+
+class WorkStealingExecutor(concurrent.futures.Executor):
+    def __init__(self, max_workers=None, instrument=True, thread_name_prefix="stealer"):
+        self._workers = [_Worker(i) for i in range(max_workers or min(32, (os.cpu_count() or 1) + 4))]
+        self._instrument = instrument
+        self._next = itertools.count()
+        self._local = threading.local()
+        self._parked = 0
+        self._wakeup = threading.Condition(threading.Lock())
+        self._shutdown = False
+        for worker in self._workers:
+            worker.thread = threading.Thread(target=self._run, args=(worker,),
+                                             name=f"{thread_name_prefix}-{worker.index}", daemon=True)
+            worker.thread.start()
+
+    # Submitting
+
+    def _target(self):
+        current = getattr(self._local, "worker", None)
+        if current is not None:
+            return current
+        return self._workers[next(self._next) % len(self._workers)]
+
+    def _push(self, worker, fn, args, kwargs):
+        if self._shutdown:
+            raise RuntimeError("cannot schedule new futures after shutdown")
+        future = concurrent.futures.Future()
+        task = (future, fn, args, kwargs, _clock() if self._instrument else 0)
+        worker.tasks.append(task)
+        if self._shutdown:  # shutdown() ran between the check and the append: the workers may be gone
+            try:
+                worker.tasks.remove(task)
+            except ValueError:
+                return future  # A worker (or cancel_futures) already took it
+            raise RuntimeError("cannot schedule new futures after shutdown")
+        return future
+
+    def _wake(self, n=1):
+        if self._parked:
+            with self._wakeup:
+                self._wakeup.notify(n)
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = self._push(self._target(), fn, args, kwargs)
+        self._wake()
+        return future
+
+    def submit_to(self, key, fn, /, *args, **kwargs):
+        """Like submit(), but prefer the worker chosen by key."""
+        future = self._push(self._workers[hash(key) % len(self._workers)], fn, args, kwargs)
+        self._wake()
+        return future
+
+    def submit_many(self, fn, iterable, star=False, affinity=None):
+        """Submit fn(item) (or fn(*item) with star=True) for every item; returns the futures in order."""
+        items = list(iterable)
+        workers = self._workers
+        if affinity is not None:
+            targets = [workers[hash(affinity) % len(workers)]]
+        else:
+            start = next(self._next)
+            targets = [workers[(start + i) % len(workers)] for i in range(len(workers))]
+        block = -(-len(items) // len(targets)) or 1
+        futures = []
+        for i, worker in enumerate(targets):
+            for item in items[i * block:(i + 1) * block]:
+                futures.append(self._push(worker, fn, item if star else (item,), {}))
+        self._wake(len(workers))
+        return futures
+
+    def map(self, fn, *iterables, timeout=None, chunksize=1):
+        futures = self.submit_many(fn, zip(*iterables), star=True)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def results():
+            try:
+                for future in futures:
+                    yield future.result(None if deadline is None else deadline - time.monotonic())
+            finally:
+                for future in futures:
+                    future.cancel()
+        return results()
+
+    # Running
+
+    def _take(self, worker):
+        try:
+            return worker.tasks.popleft()
+        except IndexError:
+            pass
+        workers = self._workers
+        n = len(workers)
+        for offset in range(1, n):
+            try:
+                task = workers[(worker.index + offset) % n].tasks.pop()
+            except IndexError:
+                continue
+            worker.stolen += 1
+            return task
+        return None
+
+    def _has_work(self):
+        return any(worker.tasks for worker in self._workers)
+
+    def _run(self, worker):
+        self._local.worker = worker
+        instrument = self._instrument
+        while True:
+            task = self._take(worker)
+            if task is None:
+                with self._wakeup:
+                    self._parked += 1
+                    # Re-check after announcing ourselves, so a submit in between cannot be missed
+                    while not self._has_work() and not self._shutdown:
+                        self._wakeup.wait()
+                    self._parked -= 1
+                if self._shutdown and not self._has_work():
+                    return
+                continue
+            future, fn, args, kwargs, submitted = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = _clock() if instrument else 0
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+            worker.executed += 1
+            if instrument:
+                finished = _clock()
+                worker.waits.record(started - submitted)
+                worker.runs.record(finished - started)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self._shutdown = True
+        if cancel_futures:
+            for worker in self._workers:
+                while worker.tasks:
+                    try:
+                        worker.tasks.pop()[0].cancel()
+                    except IndexError:
+                        break
+        with self._wakeup:
+            self._wakeup.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.thread.join()
+
+    # Metrics
+
+    def stats(self):
+        waits, runs = Histogram(), Histogram()
+        per_worker = []
+        for worker in self._workers:
+            waits.merge(worker.waits)
+            runs.merge(worker.runs)
+            per_worker.append({"worker": worker.index, "executed": worker.executed, "stolen": worker.stolen,
+                               "queued": len(worker.tasks)})
+        return {
+            "executed": sum(w["executed"] for w in per_worker),
+            "stolen": sum(w["stolen"] for w in per_worker),
+            "queue_wait": waits.summary(),
+            "run": runs.summary(),
+            "workers": per_worker,
+        }
+
+
+""" Benchmark
+1M no-op tasks through ThreadPoolExecutor and WorkStealingExecutor, submitted one by one and in a batch.
+With no-op tasks most of the time goes into creating and resolving a concurrent.futures.Future per task,
+which both executors must do; the difference is the queueing around it. The gap grows with the number of
+cores, where threads really do contend for ThreadPoolExecutor's single queue. """
+
+
+def noop():
+    return None
+
+
+def _timed(label, tasks, run):
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<42}{elapsed:>8.2f}s{tasks / elapsed:>12,.0f} tasks/s")
+
+
+def benchmark(tasks=1_000_000, workers=4):
+    def one_by_one(executor):
+        def run():
+            futures = [executor.submit(noop) for _ in range(tasks)]
+            concurrent.futures.wait(futures)
+        return run
+
+    def batch(executor):
+        def run():
+            concurrent.futures.wait(executor.submit_many(noop, itertools.repeat((), tasks), star=True))
+        return run
+
+    print(f"{tasks} no-op tasks, {workers} workers")
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        _timed("ThreadPoolExecutor submit", tasks, one_by_one(executor))
+    with WorkStealingExecutor(workers, instrument=False) as executor:
+        _timed("WorkStealingExecutor submit", tasks, one_by_one(executor))
+    with WorkStealingExecutor(workers, instrument=False) as executor:
+        _timed("WorkStealingExecutor submit_many", tasks, batch(executor))
+    with WorkStealingExecutor(workers) as executor:
+        _timed("WorkStealingExecutor submit_many, instrumented", tasks, batch(executor))
+        stats = executor.stats()
+    print(f"stolen {stats['stolen']}, queue wait p50/p99 {stats['queue_wait']['p50_ns'] / 1e6:.1f}/"
+          f"{stats['queue_wait']['p99_ns'] / 1e6:.1f} ms, run p50 {stats['run']['p50_ns']} ns")
+
+
+if __name__ == "__main__":
+    def square(x):
+        time.sleep(0.001 * (x % 3))  # Uneven task lengths make idle workers steal
+        return x * x
+
+    with WorkStealingExecutor(max_workers=4) as pool:
+        print(list(pool.map(square, range(10))), pool.submit_to("user-42", square, 7).result())
+        futures = pool.submit_many(square, range(200), affinity="hot")  # All queued on one worker
+        concurrent.futures.wait(futures)
+        stats = pool.stats()
+        print({key: stats[key] for key in ("executed", "stolen")}, stats["workers"])
+    benchmark()
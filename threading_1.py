@@ -50,7 +50,9 @@ thread.join()
 When multiple threads access shared resources, conflicts can occur. Python provides synchronization primitives 
 to avoid such issues."""
 
-""" 1-Locks: A lock prevents multiple threads from accessing a resource simultaneously."""
+""" 1-Locks: A lock prevents multiple threads from accessing a resource simultaneously.
+Lockprofiling.py has drop-in Lock/RLock/Semaphore versions that report how long threads wait for them, and a
+striped lock so that threads working on different keys do not all wait for one lock."""
 
 lock = threading.Lock()
 
@@ -71,7 +73,8 @@ B-lock.release(): Releases the lock."""
 
 rlock = threading.RLock()
 
-""" 3- Control access to a resource with a set limit."""
+""" 3- Control access to a resource with a set limit.
+When the right limit is not known in advance, Adaptivelimit.AdaptiveLimiter adjusts it from observed latency."""
 
 semaphore = threading.Semaphore(2)  # Allows up to 2 threads
 
@@ -101,38 +104,46 @@ thread.start()
 
 event.set()  # Signals the event
 
-""" 2-Queue Use queue.Queue for thread-safe communication."""
+""" 2-Queue Use queue.Queue for thread-safe communication.
+Do not stop the consumer when q.empty() is true: the queue can be empty for a moment while the producer is still
+working. The producer puts a sentinel (None) when it is finished, and the consumer stops when it receives it.
+Workqueue.py has a queue for many producers and consumers with close() and batched get/put."""
 
 import queue
 
 q = queue.Queue()
+DONE = None
 
 def producer():
     for i in range(5):
         q.put(i)
         print(f"Produced: {i}")
+    q.put(DONE)
 
 def consumer():
-    while not q.empty():
-        item = q.get()
+    while (item := q.get()) is not DONE:
         print(f"Consumed: {item}")
 
 thread1 = threading.Thread(target=producer)
 thread2 = threading.Thread(target=consumer)
 thread1.start()
-thread1.join()
 thread2.start()
+thread1.join()
 thread2.join()
 
 """ ***DEAMON THREADS *** 
-A daemon thread runs in the background and is terminated when the main program exits."""
+A daemon thread runs in the background and is terminated when the main program exits.
+A daemon thread that loops `while True` without waiting keeps a core busy. For periodic background work, a
+scheduler's daemon thread (Timerwheel.py) sleeps until the next job is due and can run many jobs."""
+
+from Timerwheel import TimerWheel
 
 def background_task():
-    while True:
-        print("Daemon thread running...")
+    print("Daemon thread running...")
 
-thread = threading.Thread(target=background_task, daemon=True)
-thread.start()
+scheduler = TimerWheel(daemon=True)
+scheduler.call_every(1.0, background_task)
+scheduler.start()
 
 """ Thread Pooling with concurrent.futures
 The ThreadPoolExecutor simplifies managing a pool of threads. """